@@ -6,25 +6,44 @@ Usage:
 
 import argparse
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from google.cloud import bigquery
 
 from common import load_config, get_client
-from extract_monthly import check_existing_data, delete_month_data, extract_month, print_summary
+from extract_monthly import get_existing_months, inserted_rows, submit_extraction
+
+# Each extraction is a MERGE into cwv_monthly, and BigQuery runs at most 2
+# mutating DML statements against one table at a time (the rest wait queued),
+# so more in-flight jobs than that only adds queueing, not throughput.
+MAX_CONCURRENT_JOBS = 2
 
 
 def generate_months(start_yyyymm, end_yyyymm):
-    """Generate list of YYYYMM integers between start and end (inclusive)."""
-    months = []
-    year = start_yyyymm // 100
-    month = start_yyyymm % 100
+    """Yield YYYYMM integers between start and end (inclusive)."""
+    year, month = divmod(start_yyyymm, 100)
+    yyyymm = start_yyyymm
 
-    while year * 100 + month <= end_yyyymm:
-        months.append(year * 100 + month)
+    while yyyymm <= end_yyyymm:
+        yield yyyymm
         month += 1
-        if month > 12:
-            month = 1
-            year += 1
+        if month == 13:
+            month, year = 1, year + 1
+        yyyymm = year * 100 + month
+
 
-    return months
+def count_months(start_yyyymm, end_yyyymm):
+    """Number of months generate_months(start, end) yields, computed directly."""
+    start_year, start_month = divmod(start_yyyymm, 100)
+    end_year, end_month = divmod(end_yyyymm, 100)
+    return max(0, (end_year - start_year) * 12 + (end_month - start_month) + 1)
+
+
+def run_extraction(client, config, yyyymm):
+    """Submit a BATCH-priority extraction for one month and wait for it to finish."""
+    job = submit_extraction(client, config, yyyymm, priority=bigquery.QueryPriority.BATCH)
+    job.result()
+    return inserted_rows(job)
 
 
 def main():
@@ -32,6 +51,9 @@ def main():
     parser.add_argument("--start", type=int, help="Start month YYYYMM (default: from config backfill_start)")
     parser.add_argument("--end", type=int, help="End month YYYYMM (default: latest available in CrUX)")
     parser.add_argument("--force", action="store_true", help="Re-extract months that already have data")
+    parser.add_argument("--jobs", type=int, default=MAX_CONCURRENT_JOBS,
+                        help=f"Max concurrent extraction jobs (default and max: {MAX_CONCURRENT_JOBS}, "
+                             "BigQuery's per-table limit on concurrent MERGE/DML)")
     parser.add_argument("--config", help="Path to settings.yaml")
     args = parser.parse_args()
 
@@ -51,37 +73,49 @@ def main():
             print("ERROR: Could not detect latest CrUX month")
             sys.exit(1)
 
-    months = generate_months(start_yyyymm, end_yyyymm)
-    print(f"Backfill range: {start_yyyymm} to {end_yyyymm} ({len(months)} months)")
+    total_months = count_months(start_yyyymm, end_yyyymm)
+    print(f"Backfill range: {start_yyyymm} to {end_yyyymm} ({total_months} months)")
 
     total_rows = 0
     skipped = 0
     errors = 0
+    to_extract = []
 
-    for i, yyyymm in enumerate(months, 1):
-        print(f"\n[{i}/{len(months)}] Processing {yyyymm}...")
+    # One query for the whole range instead of a COUNT(*) per month
+    populated = get_existing_months(client, config, start_yyyymm, end_yyyymm)
 
-        # Check existing
-        existing = check_existing_data(client, config, yyyymm)
+    for i, yyyymm in enumerate(generate_months(start_yyyymm, end_yyyymm), 1):
+        existing = populated.get(yyyymm, 0)
         if existing > 0 and not args.force:
-            print(f"  Skipping — {existing} rows already exist")
+            print(f"[{i}/{total_months}] {yyyymm}: skipping — {existing} rows already exist")
             skipped += 1
             continue
 
-        if existing > 0 and args.force:
-            delete_month_data(client, config, yyyymm)
-
-        try:
-            rows = extract_month(client, config, yyyymm)
-            if rows:
-                total_rows += rows
-        except Exception as e:
-            print(f"  ERROR: {e}")
-            errors += 1
+        # With --force, populated months are replaced in place by the extraction MERGE
+        to_extract.append(yyyymm)
+
+    if to_extract:
+        workers = max(1, min(args.jobs, MAX_CONCURRENT_JOBS, len(to_extract)))
+        print(f"\nSubmitting {len(to_extract)} extraction jobs (BATCH priority, {workers} concurrent)...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(run_extraction, client, config, yyyymm): yyyymm
+                for yyyymm in to_extract
+            }
+            for future in as_completed(futures):
+                yyyymm = futures[future]
+                try:
+                    rows = future.result()
+                    print(f"  {yyyymm}: {rows} rows inserted")
+                    if rows:
+                        total_rows += rows
+                except Exception as e:
+                    print(f"  {yyyymm}: ERROR: {e}")
+                    errors += 1
 
     print(f"\n{'='*60}")
     print(f"Backfill complete.")
-    print(f"  Months processed: {len(months) - skipped - errors}")
+    print(f"  Months processed: {total_months - skipped - errors}")
     print(f"  Months skipped:   {skipped}")
     print(f"  Errors:           {errors}")
     print(f"  Total rows added: {total_rows}")
@@ -1,24 +1,37 @@
 """Shared utilities for CrUX BigQuery scripts."""
 
+import functools
 import os
 import sys
 from pathlib import Path
 
 import yaml
-from google.cloud import bigquery
-from google.oauth2 import service_account
+
+# google.cloud / google.oauth2 are imported inside the functions that need them:
+# they take several hundred ms to import, which callers that only use the
+# config/SQL helpers (or just print --help) shouldn't pay for.
 
 # Project root is one level up from scripts/
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
+# HTTP connections kept per host. Must cover the largest thread pool that shares
+# a client (dry_run.py uses 16), or threads queue up on / re-open TLS connections.
+HTTP_POOL_SIZE = 32
+
 
 def load_config(config_path=None):
-    """Load settings from YAML config file."""
+    """Load settings from YAML config file.
+
+    Parsed once per resolved path and shared by every caller, so treat the
+    returned dict as read-only.
+    """
     if config_path is None:
         config_path = PROJECT_ROOT / "config" / "settings.yaml"
-    else:
-        config_path = Path(config_path)
+    return _load_config_file(Path(config_path).resolve())
 
+
+@functools.lru_cache(maxsize=None)
+def _load_config_file(config_path):
     if not config_path.exists():
         print(f"ERROR: Config file not found: {config_path}")
         print("Copy config/settings.example.yaml to config/settings.yaml and fill in your values.")
@@ -29,8 +42,15 @@ def load_config(config_path=None):
 
 
 def get_credentials(config):
-    """Build GCP credentials from service account key."""
-    key_path = PROJECT_ROOT / config["gcp"]["service_account_key"]
+    """Build GCP credentials from service account key (once per key file)."""
+    return _load_credentials(config["gcp"]["service_account_key"])
+
+
+@functools.lru_cache(maxsize=None)
+def _load_credentials(service_account_key):
+    from google.oauth2 import service_account
+
+    key_path = PROJECT_ROOT / service_account_key
     if not key_path.exists():
         print(f"ERROR: Service account key not found: {key_path}")
         sys.exit(1)
@@ -38,25 +58,53 @@ def get_credentials(config):
 
 
 def get_client(config):
-    """Create an authenticated BigQuery client."""
-    credentials = get_credentials(config)
+    """Return an authenticated BigQuery client.
+
+    One client is created per (project, key file, location) and shared by every
+    caller in the process, so scripts run back-to-back (see run_all.py) reuse
+    its access token and TLS connections. The client is safe to share across
+    threads for submitting queries; its HTTP session pools up to HTTP_POOL_SIZE
+    keep-alive connections so concurrent callers reuse TLS connections instead
+    of opening new ones.
+    """
+    gcp = config["gcp"]
+    return _create_client(gcp["project_id"], gcp["service_account_key"], gcp.get("location", "US"))
+
+
+@functools.lru_cache(maxsize=None)
+def _create_client(project_id, service_account_key, location):
+    import requests
+    from google.auth.transport.requests import AuthorizedSession
+    from google.cloud import bigquery
+
+    credentials = _load_credentials(service_account_key)
+    session = AuthorizedSession(credentials)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+
     return bigquery.Client(
-        project=config["gcp"]["project_id"],
+        project=project_id,
         credentials=credentials,
-        location=config["gcp"].get("location", "US"),
+        location=location,
+        _http=session,
     )
 
 
+# Table keys added after settings.yaml files were first written; used when a config omits them
+TABLE_DEFAULTS = {"cwv_monthly_agg_view": "cwv_monthly_agg"}
+
+
 def get_table_id(config, table_key):
     """Build fully-qualified table ID: project.dataset.table."""
     project = config["gcp"]["project_id"]
     dataset = config["bigquery"]["dataset_name"]
-    table = config["bigquery"][table_key]
+    table = config["bigquery"].get(table_key) or TABLE_DEFAULTS[table_key]
     return f"{project}.{dataset}.{table}"
 
 
+@functools.lru_cache(maxsize=32)
 def read_sql(filename):
-    """Read a SQL file from the sql/ directory."""
+    """Read a SQL file from the sql/ directory (cached; files don't change mid-run)."""
     sql_path = PROJECT_ROOT / "sql" / filename
     if not sql_path.exists():
         print(f"ERROR: SQL file not found: {sql_path}")
@@ -67,8 +115,6 @@ def read_sql(filename):
 
 def format_sql(sql_template, config, **kwargs):
     """Format a SQL template with project/dataset and extra params."""
-    return sql_template.format(
-        project=config["gcp"]["project_id"],
-        dataset=config["bigquery"]["dataset_name"],
-        **kwargs,
-    )
+    kwargs["project"] = config["gcp"]["project_id"]
+    kwargs["dataset"] = config["bigquery"]["dataset_name"]
+    return sql_template.format_map(kwargs)
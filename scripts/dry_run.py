@@ -3,99 +3,64 @@
 Runs all extraction and dashboard queries in dry-run mode (no data read, no cost)
 and reports the estimated bytes scanned and cost at on-demand pricing ($6.25/TB).
 
+Dashboard estimates are cached under ~/.cache/cwv-fleet-monitor/ and reused
+until the cwv_monthly or origins table is modified (or for at most 24h).
+
 Usage:
-    python scripts/dry_run.py [--months N] [--config path/to/settings.yaml]
+    python scripts/dry_run.py [--months N] [--per-query] [--no-cache] [--config path/to/settings.yaml]
 """
 
 import argparse
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
+from google.api_core.exceptions import NotFound
 from google.cloud import bigquery
 
+import query_cache
 from common import load_config, get_client, get_table_id, read_sql, format_sql
 
 
 PRICE_PER_TB = 6.25  # BigQuery on-demand pricing (USD)
-
-
-def fmt_bytes(b):
-    """Format bytes into a human-readable string."""
-    if b < 1024:
-        return f"{b} B"
-    elif b < 1024**2:
-        return f"{b / 1024:.1f} KB"
-    elif b < 1024**3:
-        return f"{b / 1024**2:.1f} MB"
-    else:
-        return f"{b / 1024**3:.2f} GB"
-
-
-def fmt_cost(b):
-    """Calculate and format cost from bytes."""
-    cost = (b / 1024**4) * PRICE_PER_TB
-    return f"${cost:.4f}"
-
-
-def dry_run_query(client, sql):
-    """Run a dry-run query and return bytes that would be scanned."""
-    job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
-    job = client.query(sql, job_config=job_config)
-    return job.total_bytes_processed
-
-
-def estimate_extraction(client, config):
-    """Estimate cost of CrUX extraction queries."""
-    print("=" * 70)
-    print("EXTRACTION QUERIES (reading from public CrUX table)")
-    print("=" * 70)
-
-    sql_template = read_sql("extract_crux_monthly.sql")
-    query = format_sql(sql_template, config, target_yyyymm=202601)
-
-    try:
-        bytes_scanned = dry_run_query(client, query)
-        print(f"\n  Single month extraction:")
-        print(f"    Data scanned:  {fmt_bytes(bytes_scanned)}")
-        print(f"    Cost:          {fmt_cost(bytes_scanned)}")
-        return bytes_scanned
-    except Exception as e:
-        print(f"\n  ERROR: {e}")
-        return 0
-
-
-def estimate_dashboard_queries(client, config):
-    """Estimate cost of Grafana dashboard queries."""
-    table = get_table_id(config, "cwv_monthly_table")
-    origins_table = get_table_id(config, "origins_table")
-
-    queries = {
-        # Fleet Overview
-        "FO: LCP Pass Rate": f"""SELECT ROUND(COUNTIF(p75_lcp <= 2500) * 100.0 / COUNT(*), 1) as value
-FROM `{table}`
-WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{table}`)
-AND device IN ('phone','desktop','tablet')""",
-
-        "FO: INP Pass Rate": f"""SELECT ROUND(COUNTIF(p75_inp <= 200) * 100.0 / COUNT(*), 1) as value
-FROM `{table}`
-WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{table}`)
-AND device IN ('phone','desktop','tablet')""",
-
-        "FO: CLS Pass Rate": f"""SELECT ROUND(COUNTIF(p75_cls <= 0.10) * 100.0 / COUNT(*), 1) as value
-FROM `{table}`
-WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{table}`)
-AND device IN ('phone','desktop','tablet')""",
-
-        "FO: FCP Pass Rate": f"""SELECT ROUND(COUNTIF(p75_fcp <= 1800) * 100.0 / COUNT(*), 1) as value
-FROM `{table}`
-WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{table}`)
-AND device IN ('phone','desktop','tablet')""",
-
-        "FO: TTFB Pass Rate": f"""SELECT ROUND(COUNTIF(p75_ttfb <= 800) * 100.0 / COUNT(*), 1) as value
-FROM `{table}`
-WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{table}`)
-AND device IN ('phone','desktop','tablet')""",
-
-        "FO: CWV Pass/Fail Pie": f"""SELECT
+DRY_RUN_WORKERS = 16  # Dry runs use no slots, so concurrency limits don't apply
+DEFAULT_SAMPLE_ORIGIN = "https://www.acadianamazda.com"  # Site Drilldown estimates
+
+_KB, _MB, _GB, _TB = 1024, 1024**2, 1024**3, 1024**4
+_PRICE_PER_BYTE = PRICE_PER_TB / _TB
+
+
+# Dashboard panel queries, grouped by prefix: FO = Fleet Overview, WO = Worst Offenders,
+# SD = Site Drilldown. Placeholders: {table}, {agg}, {origins_table} and {sample_origin}.
+# Latest-month panels keep the dashboard's own MAX(yyyymm) subquery, so the estimate
+# reflects what Grafana is billed rather than a pruned literal-month scan.
+DASHBOARD_SQL_TEMPLATES = [
+    # Fleet Overview
+    ("FO: LCP Pass Rate", """SELECT ROUND(SUM(lcp_good) * 100.0 / SUM(n), 1) as value
+FROM `{agg}`
+WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{agg}`)
+AND device IN ('phone','desktop','tablet')"""),
+
+    ("FO: INP Pass Rate", """SELECT ROUND(SUM(inp_good) * 100.0 / SUM(n), 1) as value
+FROM `{agg}`
+WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{agg}`)
+AND device IN ('phone','desktop','tablet')"""),
+
+    ("FO: CLS Pass Rate", """SELECT ROUND(SUM(cls_good) * 100.0 / SUM(n), 1) as value
+FROM `{agg}`
+WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{agg}`)
+AND device IN ('phone','desktop','tablet')"""),
+
+    ("FO: FCP Pass Rate", """SELECT ROUND(SUM(fcp_good) * 100.0 / SUM(n), 1) as value
+FROM `{agg}`
+WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{agg}`)
+AND device IN ('phone','desktop','tablet')"""),
+
+    ("FO: TTFB Pass Rate", """SELECT ROUND(SUM(ttfb_good) * 100.0 / SUM(n), 1) as value
+FROM `{agg}`
+WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{agg}`)
+AND device IN ('phone','desktop','tablet')"""),
+
+    ("FO: CWV Pass/Fail Pie", """SELECT
   COUNTIF(p75_lcp <= 2500 AND p75_inp <= 200 AND p75_cls <= 0.10) as Pass,
   COUNTIF(NOT (p75_lcp <= 2500 AND p75_inp <= 200 AND p75_cls <= 0.10)) as Fail
 FROM (
@@ -105,52 +70,59 @@ FROM (
   AND device IN ('phone','desktop','tablet')
   AND p75_lcp IS NOT NULL AND p75_inp IS NOT NULL AND p75_cls IS NOT NULL
   GROUP BY origin
-)""",
+)"""),
 
-        "FO: Pass Rate by Device": f"""SELECT device, COUNT(DISTINCT origin) as sites,
+    ("FO: Pass Rate by Device", """SELECT device, COUNT(DISTINCT origin) as sites,
   ROUND(COUNTIF(p75_lcp <= 2500) * 100.0 / COUNT(*), 1) as lcp_pass_pct,
   ROUND(COUNTIF(p75_inp <= 200) * 100.0 / COUNT(*), 1) as inp_pass_pct,
   ROUND(COUNTIF(p75_cls <= 0.10) * 100.0 / COUNT(*), 1) as cls_pass_pct,
-  ROUND(AVG(p75_lcp), 0) as avg_lcp, ROUND(AVG(p75_inp), 0) as avg_inp, ROUND(AVG(p75_cls), 2) as avg_cls
+  ROUND(COUNTIF(p75_lcp <= 2500 AND p75_inp <= 200 AND p75_cls <= 0.10) * 100.0 / COUNT(*), 1) as cwv_pass_pct,
+  ROUND(AVG(p75_lcp), 0) as avg_lcp, ROUND(AVG(p75_inp), 0) as avg_inp, ROUND(AVG(p75_cls), 2) as avg_cls,
+  ROUND(COUNTIF(p75_lcp <= 1800) * 100.0 / COUNT(*), 1) as lcp_target_pct,
+  ROUND(COUNTIF(p75_inp <= 100) * 100.0 / COUNT(*), 1) as inp_target_pct,
+  ROUND(COUNTIF(p75_cls <= 0.05) * 100.0 / COUNT(*), 1) as cls_target_pct
 FROM `{table}`
 WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{table}`)
 AND device IN ('phone','desktop','tablet') AND device IS NOT NULL
-GROUP BY device ORDER BY device""",
+GROUP BY device ORDER BY device"""),
 
-        "FO: CWV Pass Rate Trends": f"""SELECT
+    ("FO: CWV Pass Rate Trends", """SELECT
   TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
   ROUND(COUNTIF(p75_lcp <= 2500) * 100.0 / COUNT(*), 1) as lcp_good_pct,
   ROUND(COUNTIF(p75_inp <= 200) * 100.0 / COUNT(*), 1) as inp_good_pct,
-  ROUND(COUNTIF(p75_cls <= 0.10) * 100.0 / COUNT(*), 1) as cls_good_pct
+  ROUND(COUNTIF(p75_cls <= 0.10) * 100.0 / COUNT(*), 1) as cls_good_pct,
+  ROUND(COUNTIF(p75_lcp <= 1800) * 100.0 / COUNT(*), 1) as lcp_target_pct,
+  ROUND(COUNTIF(p75_inp <= 100) * 100.0 / COUNT(*), 1) as inp_target_pct,
+  ROUND(COUNTIF(p75_cls <= 0.05) * 100.0 / COUNT(*), 1) as cls_target_pct
 FROM `{table}` WHERE device IN ('phone','desktop','tablet')
-GROUP BY yyyymm ORDER BY yyyymm""",
-
-        "FO: Fleet Avg LCP Trend": f"""SELECT TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
-  ROUND(AVG(p75_lcp), 0) as avg_lcp
-FROM `{table}` WHERE device IN ('phone','desktop','tablet') AND p75_lcp IS NOT NULL
-GROUP BY yyyymm ORDER BY yyyymm""",
-
-        "FO: Fleet Avg INP Trend": f"""SELECT TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
-  ROUND(AVG(p75_inp), 0) as avg_inp
-FROM `{table}` WHERE device IN ('phone','desktop','tablet') AND p75_inp IS NOT NULL
-GROUP BY yyyymm ORDER BY yyyymm""",
-
-        "FO: Fleet Avg CLS Trend": f"""SELECT TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
-  ROUND(AVG(p75_cls), 2) as avg_cls
-FROM `{table}` WHERE device IN ('phone','desktop','tablet') AND p75_cls IS NOT NULL
-GROUP BY yyyymm ORDER BY yyyymm""",
-
-        "FO: Fleet Avg FCP Trend": f"""SELECT TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
-  ROUND(AVG(p75_fcp), 0) as avg_fcp
-FROM `{table}` WHERE device IN ('phone','desktop','tablet') AND p75_fcp IS NOT NULL
-GROUP BY yyyymm ORDER BY yyyymm""",
-
-        "FO: Fleet Avg TTFB Trend": f"""SELECT TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
-  ROUND(AVG(p75_ttfb), 0) as avg_ttfb
-FROM `{table}` WHERE device IN ('phone','desktop','tablet') AND p75_ttfb IS NOT NULL
-GROUP BY yyyymm ORDER BY yyyymm""",
-
-        "FO: OEM Brand Breakdown": f"""SELECT TRIM(brand) as brand,
+GROUP BY yyyymm ORDER BY yyyymm"""),
+
+    ("FO: Fleet Avg LCP Trend", """SELECT TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
+  ROUND(SUM(lcp_sum) / SUM(lcp_n), 0) as avg_lcp
+FROM `{agg}` WHERE device IN ('phone','desktop','tablet')
+GROUP BY yyyymm HAVING SUM(lcp_n) > 0 ORDER BY yyyymm"""),
+
+    ("FO: Fleet Avg INP Trend", """SELECT TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
+  ROUND(SUM(inp_sum) / SUM(inp_n), 0) as avg_inp
+FROM `{agg}` WHERE device IN ('phone','desktop','tablet')
+GROUP BY yyyymm HAVING SUM(inp_n) > 0 ORDER BY yyyymm"""),
+
+    ("FO: Fleet Avg CLS Trend", """SELECT TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
+  ROUND(SUM(cls_sum) / SUM(cls_n), 2) as avg_cls
+FROM `{agg}` WHERE device IN ('phone','desktop','tablet')
+GROUP BY yyyymm HAVING SUM(cls_n) > 0 ORDER BY yyyymm"""),
+
+    ("FO: Fleet Avg FCP Trend", """SELECT TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
+  ROUND(SUM(fcp_sum) / SUM(fcp_n), 0) as avg_fcp
+FROM `{agg}` WHERE device IN ('phone','desktop','tablet')
+GROUP BY yyyymm HAVING SUM(fcp_n) > 0 ORDER BY yyyymm"""),
+
+    ("FO: Fleet Avg TTFB Trend", """SELECT TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
+  ROUND(SUM(ttfb_sum) / SUM(ttfb_n), 0) as avg_ttfb
+FROM `{agg}` WHERE device IN ('phone','desktop','tablet')
+GROUP BY yyyymm HAVING SUM(ttfb_n) > 0 ORDER BY yyyymm"""),
+
+    ("FO: OEM Brand Breakdown", """SELECT TRIM(brand) as brand,
   ROUND(COUNTIF(p75_lcp <= 2500) * 100.0 / COUNT(*), 1) as lcp_good_pct,
   ROUND(COUNTIF(p75_inp <= 200) * 100.0 / COUNT(*), 1) as inp_good_pct,
   ROUND(COUNTIF(p75_cls <= 0.10) * 100.0 / COUNT(*), 1) as cls_good_pct
@@ -158,112 +130,214 @@ FROM `{table}`, UNNEST(SPLIT(oem_brand, ',')) as brand
 WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{table}`)
 AND device IN ('phone','desktop','tablet')
 AND oem_brand IS NOT NULL AND oem_brand != ''
-GROUP BY brand HAVING COUNT(*) >= 10 ORDER BY lcp_good_pct ASC""",
+GROUP BY brand HAVING COUNT(*) >= 10 ORDER BY lcp_good_pct ASC"""),
 
-        "FO: Coverage Summary": f"""SELECT COUNT(DISTINCT origin) as origins_with_data,
+    ("FO: Coverage Summary", """SELECT HLL_COUNT.MERGE(origins_sketch) as origins_with_data,
   (SELECT COUNT(*) FROM `{origins_table}` WHERE is_active = TRUE) as total_origins
-FROM `{table}` WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{table}`)""",
+FROM `{agg}` WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{agg}`)"""),
 
-        # Worst Offenders
-        "WO: LCP Distribution": f"""SELECT
+    # Worst Offenders
+    ("WO: LCP Distribution", """SELECT
   ROUND(AVG(SAFE_DIVIDE(fast_lcp, fast_lcp + avg_lcp + slow_lcp)) * 100, 1) as good,
   ROUND(AVG(SAFE_DIVIDE(avg_lcp, fast_lcp + avg_lcp + slow_lcp)) * 100, 1) as needs_improvement,
   ROUND(AVG(SAFE_DIVIDE(slow_lcp, fast_lcp + avg_lcp + slow_lcp)) * 100, 1) as poor
 FROM `{table}`
 WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{table}`)
-AND device IN ('phone','desktop','tablet') AND fast_lcp IS NOT NULL""",
+AND device IN ('phone','desktop','tablet') AND fast_lcp IS NOT NULL"""),
 
-        "WO: INP Distribution": f"""SELECT
+    ("WO: INP Distribution", """SELECT
   ROUND(AVG(SAFE_DIVIDE(fast_inp, fast_inp + avg_inp + slow_inp)) * 100, 1) as good,
   ROUND(AVG(SAFE_DIVIDE(avg_inp, fast_inp + avg_inp + slow_inp)) * 100, 1) as needs_improvement,
   ROUND(AVG(SAFE_DIVIDE(slow_inp, fast_inp + avg_inp + slow_inp)) * 100, 1) as poor
 FROM `{table}`
 WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{table}`)
-AND device IN ('phone','desktop','tablet') AND fast_inp IS NOT NULL""",
+AND device IN ('phone','desktop','tablet') AND fast_inp IS NOT NULL"""),
 
-        "WO: CLS Distribution": f"""SELECT
+    ("WO: CLS Distribution", """SELECT
   ROUND(AVG(SAFE_DIVIDE(small_cls, small_cls + medium_cls + large_cls)) * 100, 1) as good,
   ROUND(AVG(SAFE_DIVIDE(medium_cls, small_cls + medium_cls + large_cls)) * 100, 1) as needs_improvement,
   ROUND(AVG(SAFE_DIVIDE(large_cls, small_cls + medium_cls + large_cls)) * 100, 1) as poor
 FROM `{table}`
 WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{table}`)
-AND device IN ('phone','desktop','tablet') AND small_cls IS NOT NULL""",
+AND device IN ('phone','desktop','tablet') AND small_cls IS NOT NULL"""),
 
-        "WO: Worst LCP Top 25": f"""SELECT origin, dealer_name, oem_brand, state, device,
+    ("WO: Worst LCP Top 25", """SELECT origin, dealer_name, oem_brand, state, device,
   ROUND(p75_lcp, 0) as p75_lcp, ROUND(p75_inp, 0) as p75_inp, ROUND(p75_cls, 2) as p75_cls
 FROM `{table}`
 WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{table}`)
 AND device IN ('phone','desktop','tablet') AND p75_lcp IS NOT NULL
-ORDER BY p75_lcp DESC LIMIT 25""",
+ORDER BY p75_lcp DESC LIMIT 25"""),
 
-        "WO: Worst INP Top 25": f"""SELECT origin, dealer_name, oem_brand, state, device,
+    ("WO: Worst INP Top 25", """SELECT origin, dealer_name, oem_brand, state, device,
   ROUND(p75_inp, 0) as p75_inp, ROUND(p75_lcp, 0) as p75_lcp, ROUND(p75_cls, 2) as p75_cls
 FROM `{table}`
 WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{table}`)
 AND device IN ('phone','desktop','tablet') AND p75_inp IS NOT NULL
-ORDER BY p75_inp DESC LIMIT 25""",
+ORDER BY p75_inp DESC LIMIT 25"""),
 
-        "WO: Worst CLS Top 25": f"""SELECT origin, dealer_name, oem_brand, state, device,
+    ("WO: Worst CLS Top 25", """SELECT origin, dealer_name, oem_brand, state, device,
   ROUND(p75_cls, 2) as p75_cls, ROUND(p75_lcp, 0) as p75_lcp, ROUND(p75_inp, 0) as p75_inp
 FROM `{table}`
 WHERE yyyymm = (SELECT MAX(yyyymm) FROM `{table}`)
 AND device IN ('phone','desktop','tablet') AND p75_cls IS NOT NULL
-ORDER BY p75_cls DESC LIMIT 25""",
+ORDER BY p75_cls DESC LIMIT 25"""),
 
-        # Site Drilldown (using a sample origin)
-        "SD: Site Info": f"""SELECT dealer_name, oem_brand, state, platform_version
+    # Site Drilldown (using a sample origin)
+    ("SD: Site Info", """SELECT dealer_name, oem_brand, state, platform_version
 FROM `{table}`
-WHERE origin = 'https://www.acadianamazda.com'
-AND yyyymm = (SELECT MAX(yyyymm) FROM `{table}` WHERE origin = 'https://www.acadianamazda.com')
-LIMIT 1""",
+WHERE origin = '{sample_origin}'
+AND yyyymm = (SELECT MAX(yyyymm) FROM `{table}` WHERE origin = '{sample_origin}')
+LIMIT 1"""),
 
-        "SD: LCP Status": f"""SELECT ROUND(AVG(p75_lcp), 0) as p75_lcp_ms
+    ("SD: LCP Status", """SELECT ROUND(AVG(p75_lcp), 0) as p75_lcp_ms
 FROM `{table}`
-WHERE origin = 'https://www.acadianamazda.com'
+WHERE origin = '{sample_origin}'
 AND device IN ('phone','desktop','tablet')
-AND yyyymm = (SELECT MAX(yyyymm) FROM `{table}` WHERE origin = 'https://www.acadianamazda.com')""",
+AND yyyymm = (SELECT MAX(yyyymm) FROM `{table}` WHERE origin = '{sample_origin}')"""),
 
-        "SD: INP Status": f"""SELECT ROUND(AVG(p75_inp), 0) as p75_inp_ms
+    ("SD: INP Status", """SELECT ROUND(AVG(p75_inp), 0) as p75_inp_ms
 FROM `{table}`
-WHERE origin = 'https://www.acadianamazda.com'
+WHERE origin = '{sample_origin}'
 AND device IN ('phone','desktop','tablet')
-AND yyyymm = (SELECT MAX(yyyymm) FROM `{table}` WHERE origin = 'https://www.acadianamazda.com')""",
+AND yyyymm = (SELECT MAX(yyyymm) FROM `{table}` WHERE origin = '{sample_origin}')"""),
 
-        "SD: CLS Status": f"""SELECT ROUND(AVG(p75_cls), 2) as p75_cls
+    ("SD: CLS Status", """SELECT ROUND(AVG(p75_cls), 2) as p75_cls
 FROM `{table}`
-WHERE origin = 'https://www.acadianamazda.com'
+WHERE origin = '{sample_origin}'
 AND device IN ('phone','desktop','tablet')
-AND yyyymm = (SELECT MAX(yyyymm) FROM `{table}` WHERE origin = 'https://www.acadianamazda.com')""",
+AND yyyymm = (SELECT MAX(yyyymm) FROM `{table}` WHERE origin = '{sample_origin}')"""),
 
-        "SD: LCP Trend": f"""SELECT TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
+    ("SD: LCP Trend", """SELECT TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
   ROUND(AVG(p75_lcp), 0) as p75_lcp
 FROM `{table}`
-WHERE origin = 'https://www.acadianamazda.com'
+WHERE origin = '{sample_origin}'
 AND device IN ('phone','desktop','tablet') AND p75_lcp IS NOT NULL
-GROUP BY yyyymm ORDER BY yyyymm""",
+GROUP BY yyyymm ORDER BY yyyymm"""),
 
-        "SD: LCP Distribution": f"""SELECT TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
+    ("SD: LCP Distribution", """SELECT TIMESTAMP(PARSE_DATE('%Y%m', CAST(yyyymm AS STRING))) as time,
   ROUND(AVG(SAFE_DIVIDE(fast_lcp, fast_lcp + avg_lcp + slow_lcp)) * 100, 1) as good,
   ROUND(AVG(SAFE_DIVIDE(avg_lcp, fast_lcp + avg_lcp + slow_lcp)) * 100, 1) as needs_improvement,
   ROUND(AVG(SAFE_DIVIDE(slow_lcp, fast_lcp + avg_lcp + slow_lcp)) * 100, 1) as poor
 FROM `{table}`
-WHERE origin = 'https://www.acadianamazda.com'
+WHERE origin = '{sample_origin}'
 AND device IN ('phone','desktop','tablet') AND fast_lcp IS NOT NULL
-GROUP BY yyyymm ORDER BY yyyymm""",
+GROUP BY yyyymm ORDER BY yyyymm"""),
 
-        "SD: Device Breakdown": f"""SELECT device,
+    ("SD: Device Breakdown", """SELECT device,
   ROUND(AVG(p75_lcp), 0) as p75_lcp, ROUND(AVG(p75_inp), 0) as p75_inp,
   ROUND(AVG(p75_cls), 2) as p75_cls, ROUND(AVG(p75_fcp), 0) as p75_fcp,
   ROUND(AVG(p75_ttfb), 0) as p75_ttfb
 FROM `{table}`
-WHERE origin = 'https://www.acadianamazda.com'
-AND yyyymm = (SELECT MAX(yyyymm) FROM `{table}` WHERE origin = 'https://www.acadianamazda.com')
-AND device IS NOT NULL GROUP BY device ORDER BY device""",
-    }
+WHERE origin = '{sample_origin}'
+AND yyyymm = (SELECT MAX(yyyymm) FROM `{table}` WHERE origin = '{sample_origin}')
+AND device IS NOT NULL GROUP BY device ORDER BY device"""),
+]
 
-    print("\n" + "=" * 70)
-    print("GRAFANA DASHBOARD QUERIES (reading from cwv_monthly table)")
+
+def fmt_bytes(b):
+    """Format bytes into a human-readable string."""
+    if b < _KB:
+        return f"{b} B"
+    elif b < _MB:
+        return f"{b / _KB:.1f} KB"
+    elif b < _GB:
+        return f"{b / _MB:.1f} MB"
+    else:
+        return f"{b / _GB:.2f} GB"
+
+
+def fmt_cost(b):
+    """Calculate and format cost from bytes."""
+    return f"${b * _PRICE_PER_BYTE:.4f}"
+
+
+def dry_run_query(client, sql, table_mtime=None):
+    """Run a dry-run query and return bytes that would be scanned.
+
+    If table_mtime is given, the result is looked up in (and stored to) the
+    local query cache keyed by the SQL and that modification time.
+    """
+    def run():
+        job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+        job = client.query(sql, job_config=job_config)
+        return job.total_bytes_processed
+
+    if table_mtime is None:
+        return run()
+    # dry_run in the key keeps estimates apart from cached results of the same SQL
+    return query_cache.get_or_compute(sql, table_mtime, run, {"dry_run": True})
+
+
+def dry_run_many(client, queries, table_mtime=None):
+    """Dry-run a {name: sql} mapping concurrently.
+
+    Returns {name: bytes}; a query that fails maps to its exception instead.
+    """
+    def run(sql):
+        try:
+            return dry_run_query(client, sql, table_mtime)
+        except Exception as e:
+            return e
+
+    if not queries:
+        return {}
+    with ThreadPoolExecutor(max_workers=DRY_RUN_WORKERS) as executor:
+        return dict(zip(queries, executor.map(run, queries.values())))
+
+
+def get_tables_mtime(client, *table_ids):
+    """Return the latest modification time (epoch seconds) across the given tables.
+
+    Tables that don't exist yet (e.g. the agg view before setup_dataset.py has
+    been re-run) are skipped; their queries just fail to dry-run.
+    """
+    mtimes = []
+    for table_id in table_ids:
+        try:
+            mtimes.append(client.get_table(table_id).modified.timestamp())
+        except NotFound:
+            continue
+    return max(mtimes, default=0)
+
+
+def estimate_extraction(client, config):
+    """Estimate cost of CrUX extraction queries."""
     print("=" * 70)
+    print("EXTRACTION QUERIES (reading from public CrUX table)")
+    print("=" * 70)
+
+    sql_template = read_sql("extract_crux_monthly.sql")
+    query = format_sql(sql_template, config, target_yyyymm=202601)
+
+    try:
+        bytes_scanned = dry_run_query(client, query)
+        print(f"\n  Single month extraction:")
+        print(f"    Data scanned:  {fmt_bytes(bytes_scanned)}")
+        print(f"    Cost:          {fmt_cost(bytes_scanned)}")
+        return bytes_scanned
+    except Exception as e:
+        print(f"\n  ERROR: {e}")
+        return 0
+
+
+def estimate_dashboard_queries(client, config, use_cache=True, per_query=False):
+    """Estimate cost of Grafana dashboard queries."""
+    table = get_table_id(config, "cwv_monthly_table")
+    origins_table = get_table_id(config, "origins_table")
+    agg = get_table_id(config, "cwv_monthly_agg_view")
+
+    # Fetched once per run; any write to these tables invalidates cached estimates
+    table_mtime = get_tables_mtime(client, table, origins_table, agg) if use_cache else None
+
+    sample_origin = config.get("dry_run", {}).get("sample_origin", DEFAULT_SAMPLE_ORIGIN)
+
+    ctx = {
+        "table": table,
+        "agg": agg,
+        "origins_table": origins_table,
+        "sample_origin": sample_origin,
+    }
+    queries = {name: sql.format_map(ctx) for name, sql in DASHBOARD_SQL_TEMPLATES}
 
     dashboard_groups = {
         "Fleet Overview": "FO:",
@@ -271,28 +345,66 @@ AND device IS NOT NULL GROUP BY device ORDER BY device""",
         "Site Drilldown": "SD:",
     }
 
+    groups = {
+        dashboard_name: [(name, sql) for name, sql in queries.items() if name.startswith(prefix)]
+        for dashboard_name, prefix in dashboard_groups.items()
+    }
+
+    # Dry runs don't consume slots, so fire them all concurrently and print in order afterwards.
+    combined = {}
+    if not per_query:
+        # One RPC per dashboard; BigQuery only reports a script-level total for
+        # dry runs, so itemized rows need --per-query.
+        combined = dry_run_many(client, {
+            dashboard_name: ";\n".join(sql for _, sql in group)
+            for dashboard_name, group in groups.items()
+        }, table_mtime)
+
+    itemized = dry_run_many(client, {
+        name: sql
+        for dashboard_name, group in groups.items()
+        if per_query or isinstance(combined[dashboard_name], Exception)
+        for name, sql in group
+    }, table_mtime)
+
+    # Build the report in a buffer and write it once, rather than a print per row
+    lines = [
+        "",
+        "=" * 70,
+        "GRAFANA DASHBOARD QUERIES (reading from cwv_monthly / cwv_monthly_agg)",
+        "=" * 70,
+    ]
     grand_total = 0
 
-    for dashboard_name, prefix in dashboard_groups.items():
-        print(f"\n  {dashboard_name}:")
-        print(f"  {'Query':<35} {'Scanned':<12} {'Cost':<12}")
-        print(f"  {'-' * 35} {'-' * 12} {'-' * 12}")
-
-        dashboard_total = 0
-        for name, sql in queries.items():
-            if not name.startswith(prefix):
-                continue
-            try:
-                b = dry_run_query(client, sql)
+    for dashboard_name, group in groups.items():
+        lines.append("")
+        lines.append(f"  {dashboard_name}:")
+        lines.append(f"  {'Query':<35} {'Scanned':<12} {'Cost':<12}")
+        lines.append(f"  {'-' * 35} {'-' * 12} {'-' * 12}")
+
+        result = combined.get(dashboard_name)
+        if result is not None and not isinstance(result, Exception):
+            dashboard_total = result
+            label = f"{len(group)} queries (combined)"
+            lines.append(f"  {label:<35} {fmt_bytes(dashboard_total):<12} {fmt_cost(dashboard_total):<12}")
+        else:
+            if result is not None:
+                lines.append(f"  Combined dry-run failed, falling back to per-query: {result}")
+            dashboard_total = 0
+            for name, _ in group:
+                b = itemized[name]
+                if isinstance(b, Exception):
+                    lines.append(f"  {name:<35} ERROR: {b}")
+                    continue
                 dashboard_total += b
-                print(f"  {name:<35} {fmt_bytes(b):<12} {fmt_cost(b):<12}")
-            except Exception as e:
-                print(f"  {name:<35} ERROR: {e}")
+                lines.append(f"  {name:<35} {fmt_bytes(b):<12} {fmt_cost(b):<12}")
 
         grand_total += dashboard_total
-        print(f"  {'Subtotal':<35} {fmt_bytes(dashboard_total):<12} {fmt_cost(dashboard_total):<12}")
+        lines.append(f"  {'Subtotal':<35} {fmt_bytes(dashboard_total):<12} {fmt_cost(dashboard_total):<12}")
 
-    print(f"\n  {'ALL DASHBOARDS TOTAL':<35} {fmt_bytes(grand_total):<12} {fmt_cost(grand_total):<12}")
+    lines.append("")
+    lines.append(f"  {'ALL DASHBOARDS TOTAL':<35} {fmt_bytes(grand_total):<12} {fmt_cost(grand_total):<12}")
+    sys.stdout.write("\n".join(lines) + "\n")
 
     return grand_total
 
@@ -303,7 +415,7 @@ def print_summary(extraction_bytes, dashboard_bytes, backfill_months):
     print("COST SUMMARY (on-demand pricing: $6.25/TB)")
     print("=" * 70)
 
-    ext_cost = (extraction_bytes / 1024**4) * PRICE_PER_TB
+    ext_cost = extraction_bytes * _PRICE_PER_BYTE
     backfill_cost = ext_cost * backfill_months
 
     print(f"\n  Extraction:")
@@ -311,7 +423,7 @@ def print_summary(extraction_bytes, dashboard_bytes, backfill_months):
     print(f"    {backfill_months}-month backfill:    {fmt_bytes(extraction_bytes * backfill_months):>12}    ${backfill_cost:.2f}")
     print(f"    Ongoing monthly:     {fmt_bytes(extraction_bytes):>12}    {fmt_cost(extraction_bytes)}")
 
-    page_load_cost = (dashboard_bytes / 1024**4) * PRICE_PER_TB
+    page_load_cost = dashboard_bytes * _PRICE_PER_BYTE
     print(f"\n  Dashboard queries:")
     print(f"    Per page load:       {fmt_bytes(dashboard_bytes):>12}    {fmt_cost(dashboard_bytes)}")
     print(f"    50 loads/day:        {fmt_bytes(dashboard_bytes * 50):>12}    {fmt_cost(dashboard_bytes * 50)}")
@@ -332,6 +444,10 @@ def main():
     parser = argparse.ArgumentParser(description="Estimate BigQuery costs via dry-run queries")
     parser.add_argument("--months", type=int, default=24,
                         help="Number of months for backfill estimate (default: 24)")
+    parser.add_argument("--per-query", action="store_true",
+                        help="Itemize each dashboard query instead of one combined dry-run per dashboard")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore the local dry-run cache and re-estimate every query")
     parser.add_argument("--config", help="Path to settings.yaml")
     args = parser.parse_args()
 
@@ -339,7 +455,8 @@ def main():
     client = get_client(config)
 
     extraction_bytes = estimate_extraction(client, config)
-    dashboard_bytes = estimate_dashboard_queries(client, config)
+    dashboard_bytes = estimate_dashboard_queries(client, config, use_cache=not args.no_cache,
+                                                 per_query=args.per_query)
     print_summary(extraction_bytes, dashboard_bytes, args.months)
 
 
@@ -7,6 +7,8 @@ Usage:
 import argparse
 import sys
 
+from google.cloud import bigquery
+
 from common import load_config, get_client, get_table_id, read_sql, format_sql
 
 
@@ -14,48 +16,77 @@ def get_latest_crux_month(client, config):
     """Auto-detect the latest available month in the CrUX public dataset."""
     source_table = config["crux"]["source_table"]
     query = f"SELECT MAX(yyyymm) as latest FROM `{source_table}`"
-    result = client.query(query).result()
+    result = client.query_and_wait(query)
     for row in result:
         return row.latest
     return None
 
 
+def _partitions_view(config):
+    """Fully-qualified INFORMATION_SCHEMA.PARTITIONS view for the dataset."""
+    return f"{config['gcp']['project_id']}.{config['bigquery']['dataset_name']}.INFORMATION_SCHEMA.PARTITIONS"
+
+
 def check_existing_data(client, config, target_yyyymm):
-    """Check if data already exists for the target month."""
-    table_id = get_table_id(config, "cwv_monthly_table")
-    query = f"SELECT COUNT(*) as cnt FROM `{table_id}` WHERE yyyymm = {target_yyyymm}"
-    result = client.query(query).result()
+    """Check if data already exists for the target month.
+
+    cwv_monthly is range-partitioned on yyyymm (one partition per month), so the
+    row count comes from partition metadata instead of a COUNT(*) table scan.
+    """
+    query = f"""
+    SELECT total_rows
+    FROM `{_partitions_view(config)}`
+    WHERE table_name = '{config["bigquery"]["cwv_monthly_table"]}'
+      AND partition_id = '{target_yyyymm}'
+    """
+    result = client.query_and_wait(query)
     for row in result:
-        return row.cnt
+        return row.total_rows or 0
     return 0
 
 
-def delete_month_data(client, config, target_yyyymm):
-    """Delete existing data for a month (used with --force)."""
-    table_id = get_table_id(config, "cwv_monthly_table")
-    query = f"DELETE FROM `{table_id}` WHERE yyyymm = {target_yyyymm}"
-    job = client.query(query)
-    job.result()
-    print(f"  Deleted existing data for {target_yyyymm}")
+def get_existing_months(client, config, start_yyyymm, end_yyyymm):
+    """Return {yyyymm: row_count} for every month in the range that already has data."""
+    query = f"""
+    SELECT SAFE_CAST(partition_id AS INT64) as yyyymm, total_rows as cnt
+    FROM `{_partitions_view(config)}`
+    WHERE table_name = '{config["bigquery"]["cwv_monthly_table"]}'
+      AND SAFE_CAST(partition_id AS INT64) BETWEEN {start_yyyymm} AND {end_yyyymm}
+      AND total_rows > 0
+    """
+    return {row.yyyymm: row.cnt for row in client.query_and_wait(query)}
 
 
-def extract_month(client, config, target_yyyymm):
-    """Run the extraction query for a specific month."""
+def submit_extraction(client, config, target_yyyymm, priority=bigquery.QueryPriority.INTERACTIVE):
+    """Submit the extraction MERGE for a month and return the QueryJob without waiting.
+
+    The MERGE replaces any existing rows for the month in the same job, so
+    re-extracting doesn't need a separate DELETE.
+    """
     sql_template = read_sql("extract_crux_monthly.sql")
     query = format_sql(sql_template, config, target_yyyymm=target_yyyymm)
+    job_config = bigquery.QueryJobConfig(priority=priority)
+    return client.query(query, job_config=job_config)
 
+
+def extract_month(client, config, target_yyyymm, priority=bigquery.QueryPriority.INTERACTIVE):
+    """Run the extraction query for a specific month."""
     print(f"  Executing extraction query for {target_yyyymm}...")
-    job = client.query(query)
+    job = submit_extraction(client, config, target_yyyymm, priority=priority)
     job.result()
 
-    # Get row count
-    rows_inserted = job.num_dml_affected_rows
+    rows_inserted = inserted_rows(job)
     print(f"  Rows inserted: {rows_inserted}")
     return rows_inserted
 
 
+def inserted_rows(job):
+    """Rows inserted by a finished extraction job (excludes rows the MERGE replaced)."""
+    return job.dml_stats.inserted_row_count if job.dml_stats else job.num_dml_affected_rows
+
+
 def print_summary(client, config, target_yyyymm):
-    """Print a summary of the extracted data."""
+    """Print a summary of the extracted data (one row per device)."""
     table_id = get_table_id(config, "cwv_monthly_table")
     query = f"""
     SELECT
@@ -71,11 +102,11 @@ def print_summary(client, config, target_yyyymm):
     GROUP BY device
     ORDER BY device
     """
-    result = client.query(query).result()
+    results = client.query_and_wait(query)
     print(f"\n  Summary for {target_yyyymm}:")
     print(f"  {'Device':<10} {'Origins':>8} {'LCP':>8} {'INP':>8} {'CLS':>8} {'FCP':>8} {'TTFB':>8}")
     print(f"  {'-'*10} {'-'*8} {'-'*8} {'-'*8} {'-'*8} {'-'*8} {'-'*8}")
-    for row in result:
+    for row in results:
         def fmt(val, decimals=0):
             if val is None:
                 return "     N/A"
@@ -110,8 +141,7 @@ def main():
     existing = check_existing_data(client, config, target_yyyymm)
     if existing > 0:
         if args.force:
-            print(f"  Found {existing} existing rows — deleting (--force)")
-            delete_month_data(client, config, target_yyyymm)
+            print(f"  Found {existing} existing rows — replacing (--force)")
         else:
             print(f"  Data already exists ({existing} rows). Use --force to re-extract.")
             sys.exit(0)
@@ -5,98 +5,145 @@ Usage:
 """
 
 import argparse
+import csv
+import json
 import sys
+import tempfile
+from datetime import datetime, timezone
 from pathlib import Path
 
-import pandas as pd
 from google.cloud import bigquery
 
 from common import load_config, get_client, get_table_id, PROJECT_ROOT
+from setup_dataset import ORIGINS_SCHEMA
 
 
-def validate_origins(df):
-    """Validate origins DataFrame. Returns (clean_df, errors)."""
-    errors = []
+# String columns copied from the CSV; blank/missing values are loaded as ""
+STRING_COLUMNS = ["origin", "dealer_name", "dealer_group", "oem_brand",
+                  "region", "state", "platform_version", "tags"]
 
-    # Check required column
-    if "origin" not in df.columns:
-        return df, ["Missing required column: origin"]
+# --append loads below this many rows use a streaming insert instead of a load job
+STREAMING_INSERT_MAX_ROWS = 500
 
-    # Check https:// prefix
-    bad_prefix = df[~df["origin"].str.startswith("https://")]
-    if len(bad_prefix) > 0:
-        errors.append(f"{len(bad_prefix)} origins missing https:// prefix: {bad_prefix['origin'].tolist()[:5]}")
 
-    # Remove trailing slashes
-    df["origin"] = df["origin"].str.rstrip("/")
+def validate_origins(rows, errors):
+    """Validate and clean origin rows (dicts) in a single streaming pass.
 
-    # Check duplicates
-    dupes = df[df["origin"].duplicated(keep="first")]
-    if len(dupes) > 0:
-        errors.append(f"{len(dupes)} duplicate origins removed: {dupes['origin'].tolist()[:5]}")
-        df = df.drop_duplicates(subset=["origin"], keep="first")
+    Yields rows with trailing slashes stripped and duplicates dropped (first
+    occurrence wins). Warnings are appended to errors once rows is exhausted.
+    """
+    seen = set()
+    bad_prefix_count, bad_prefix = 0, []
+    dupe_count, dupes = 0, []
 
-    return df, errors
+    for row in rows:
+        origin = row["origin"] or ""
 
+        # Check https:// prefix
+        if not origin.startswith("https://"):
+            bad_prefix_count += 1
+            if len(bad_prefix) < 5:
+                bad_prefix.append(origin)
 
-def load_origins(client, config, csv_path, append=False):
-    """Load origins from CSV into BigQuery."""
-    table_id = get_table_id(config, "origins_table")
+        # Remove trailing slashes
+        origin = origin.rstrip("/")
+
+        # Check duplicates
+        if origin in seen:
+            dupe_count += 1
+            if len(dupes) < 5:
+                dupes.append(origin)
+            continue
+        seen.add(origin)
+
+        row["origin"] = origin
+        yield row
+
+    if bad_prefix_count:
+        errors.append(f"{bad_prefix_count} origins missing https:// prefix: {bad_prefix}")
+    if dupe_count:
+        errors.append(f"{dupe_count} duplicate origins removed: {dupes}")
+
+
+def _is_active(value):
+    """Parse the is_active CSV field; blank means active."""
+    value = (value or "").strip().lower()
+    return value not in ("false", "0", "no", "n", "f")
 
-    # Read CSV
-    df = pd.read_csv(csv_path)
-    print(f"Read {len(df)} rows from {csv_path}")
 
-    # Validate
-    df, errors = validate_origins(df)
-    for err in errors:
-        print(f"  WARNING: {err}")
+def _stream_validate(csv_path, out, errors):
+    """Validate csv_path row by row and write cleaned rows to out (binary) as NDJSON.
 
-    # Add timestamps
-    df["added_at"] = pd.Timestamp.now(tz="UTC")
-    df["updated_at"] = pd.Timestamp.now(tz="UTC")
+    Returns the number of rows written. Memory use is constant apart from the
+    set of origins seen so far (needed for de-duplication).
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    row_count = 0
 
-    # Ensure correct dtypes for string columns (pandas may infer numeric)
-    string_cols = ["origin", "dealer_name", "dealer_group", "oem_brand",
-                   "region", "state", "platform_version", "tags"]
-    for col in string_cols:
-        if col in df.columns:
-            df[col] = df[col].astype(str).replace("nan", "")
+    with open(csv_path, newline="", encoding="utf-8") as src:
+        reader = csv.DictReader(src)
+        if "origin" not in (reader.fieldnames or []):
+            print(f"ERROR: Missing required column: origin ({csv_path})")
+            sys.exit(1)
 
-    # Ensure boolean column
-    if "is_active" in df.columns:
-        df["is_active"] = df["is_active"].astype(bool)
+        for row in validate_origins(reader, errors):
+            record = {col: row.get(col) or "" for col in STRING_COLUMNS}
+            record["is_active"] = _is_active(row.get("is_active"))
+            record["added_at"] = record["updated_at"] = now
+            out.write(json.dumps(record).encode("utf-8") + b"\n")
+            row_count += 1
+
+    return row_count
+
+
+def load_origins(client, config, csv_path, append=False):
+    """Load origins from CSV into BigQuery."""
+    table_id = get_table_id(config, "origins_table")
 
-    # Load to BigQuery
     write_disposition = (
         bigquery.WriteDisposition.WRITE_APPEND if append
         else bigquery.WriteDisposition.WRITE_TRUNCATE
     )
 
     job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
         write_disposition=write_disposition,
-        schema=[
-            bigquery.SchemaField("origin", "STRING", mode="REQUIRED"),
-            bigquery.SchemaField("dealer_name", "STRING"),
-            bigquery.SchemaField("dealer_group", "STRING"),
-            bigquery.SchemaField("oem_brand", "STRING"),
-            bigquery.SchemaField("region", "STRING"),
-            bigquery.SchemaField("state", "STRING"),
-            bigquery.SchemaField("platform_version", "STRING"),
-            bigquery.SchemaField("is_active", "BOOLEAN"),
-            bigquery.SchemaField("tags", "STRING"),
-            bigquery.SchemaField("added_at", "TIMESTAMP"),
-            bigquery.SchemaField("updated_at", "TIMESTAMP"),
-        ],
+        schema=ORIGINS_SCHEMA,
     )
 
-    job = client.load_table_from_dataframe(df, table_id, job_config=job_config)
-    job.result()  # Wait for completion
+    errors = []
+
+    # Stream CSV -> validate -> temp NDJSON file, then upload it as a load job
+    with tempfile.TemporaryFile(suffix=".ndjson") as tmp:
+        row_count = _stream_validate(csv_path, tmp, errors)
+
+        print(f"Read {row_count} valid rows from {csv_path}")
+        for err in errors:
+            print(f"  WARNING: {err}")
+
+        tmp.seek(0)
+        if append and row_count < STREAMING_INSERT_MAX_ROWS:
+            # Small incremental update: skip load-job scheduling overhead
+            streamed = True
+            if row_count:
+                rows = [json.loads(line) for line in tmp]
+                insert_errors = client.insert_rows_json(table_id, rows)
+                if insert_errors:
+                    print(f"ERROR: Streaming insert failed for {len(insert_errors)} rows: {insert_errors[:5]}")
+                    sys.exit(1)
+        else:
+            streamed = False
+            job = client.load_table_from_file(tmp, table_id, job_config=job_config)
+            job.result()  # Wait for completion
 
     table = client.get_table(table_id)
     mode = "appended" if append else "loaded (full reload)"
-    print(f"\nSuccessfully {mode} {len(df)} rows into {table_id}")
-    print(f"Total rows in table: {table.num_rows}")
+    print(f"\nSuccessfully {mode} {row_count} rows into {table_id}")
+    if streamed:
+        # num_rows excludes rows still in the streaming buffer
+        print(f"Total rows in table: {table.num_rows} (+ {row_count} in streaming buffer)")
+    else:
+        print(f"Total rows in table: {table.num_rows}")
 
 
 def main():
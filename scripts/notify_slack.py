@@ -1,17 +1,22 @@
 """Post a formatted Slack summary after monthly CrUX extraction.
 
 Usage:
-    python scripts/notify_slack.py [--month YYYYMM] [--config path/to/settings.yaml] [--dry-run]
+    python scripts/notify_slack.py [--month YYYYMM] [--config path/to/settings.yaml] [--dry-run] [--no-cache] [--resend]
 """
 
 import argparse
+import collections
+import hashlib
 import json
 import os
 import sys
-import urllib.request
-import urllib.error
 
-from common import load_config, get_client, read_sql, format_sql
+import requests
+from google.cloud import bigquery
+from urllib3.util.retry import Retry
+
+import query_cache
+from common import load_config, get_client, get_table_id, read_sql, format_sql
 
 
 # ---------------------------------------------------------------------------
@@ -26,19 +31,6 @@ def compute_prev_month(yyyymm):
     return year * 100 + (month - 1)
 
 
-def check_prev_month_exists(client, config, prev_yyyymm):
-    """Return True if cwv_monthly has data for prev_yyyymm."""
-    project = config["gcp"]["project_id"]
-    dataset = config["bigquery"]["dataset_name"]
-    query = (
-        f"SELECT COUNT(*) AS cnt FROM `{project}.{dataset}.cwv_monthly` "
-        f"WHERE yyyymm = {prev_yyyymm}"
-    )
-    for row in client.query(query).result():
-        return row.cnt > 0
-    return False
-
-
 def format_month_label(yyyymm):
     """202601 -> '2026-01'."""
     return f"{yyyymm // 100}-{yyyymm % 100:02d}"
@@ -48,115 +40,140 @@ def format_month_label(yyyymm):
 # Data fetching
 # ---------------------------------------------------------------------------
 
-def fetch_fleet_summary(client, config, target_yyyymm, prev_yyyymm):
-    """Run fleet summary SQL and return a dict of stats."""
-    sql = read_sql("slack_fleet_summary.sql")
-    query = format_sql(sql, config,
-                       target_yyyymm=target_yyyymm,
-                       prev_yyyymm=prev_yyyymm)
-    rows = list(client.query(query).result())
-    if not rows:
-        return None
-    row = rows[0]
-    return {col: getattr(row, col) for col in row.keys()}
-
-
-def fetch_regressions(client, config, target_yyyymm, prev_yyyymm):
-    """Run regressions SQL, return dict grouped by category."""
-    sql = read_sql("slack_regressions.sql")
-    query = format_sql(sql, config,
-                       target_yyyymm=target_yyyymm,
-                       prev_yyyymm=prev_yyyymm)
+def _section_sql(filename, config):
+    """Read and format one section query, with its own trailing newline."""
+    return format_sql(read_sql(filename), config).rstrip() + "\n"
+
+
+def build_notification_query(config):
+    """Combine the Slack section queries into one single-row query.
+
+    Months are bound at run time as @target_yyyymm / @prev_yyyymm, so the SQL
+    text is the same every month.
+    """
+    return format_sql(
+        read_sql("slack_combined.sql"), config,
+        fleet_summary=_section_sql("slack_fleet_summary.sql", config),
+        regressions=_section_sql("slack_regressions.sql", config),
+        improvements=_section_sql("slack_improvements.sql", config),
+        worst_offenders=_section_sql("slack_worst_offenders.sql", config),
+    )
+
+
+# One site/device that crossed a threshold between months (regressions, improvements)
+Change = collections.namedtuple("Change", "origin device dealer_name current_value prev_value delta")
+# One site/device in a metric's top-5 worst list
+Offender = collections.namedtuple("Offender", "origin device dealer_name p75_lcp p75_inp p75_cls")
+
+
+def _group_by_category(rows):
+    """Group regression/improvement rows (dicts) into Change lists by category."""
     results = {}
-    for row in client.query(query).result():
-        cat = row.category
-        results.setdefault(cat, []).append({
-            "origin": row.origin,
-            "device": row.device,
-            "dealer_name": row.dealer_name,
-            "current_value": row.current_value,
-            "prev_value": row.prev_value,
-            "delta": row.delta,
-        })
+    for row in rows:
+        results.setdefault(row["category"], []).append(Change(
+            row["origin"], row["device"], row["dealer_name"],
+            row["current_value"], row["prev_value"], row["delta"],
+        ))
     return results
 
 
-def fetch_worst_offenders(client, config, target_yyyymm):
-    """Run worst offenders SQL, return dict grouped by metric."""
-    sql = read_sql("slack_worst_offenders.sql")
-    query = format_sql(sql, config, target_yyyymm=target_yyyymm)
+def _group_worst_offenders(rows):
+    """Bucket worst-offender rows (dicts, already top 5 per metric in rank order) by metric."""
     results = {"lcp": [], "inp": [], "cls": []}
-    for row in client.query(query).result():
-        entry = {
-            "origin": row.origin,
-            "device": row.device,
-            "dealer_name": row.dealer_name,
-            "p75_lcp": row.p75_lcp,
-            "p75_inp": row.p75_inp,
-            "p75_cls": row.p75_cls,
-        }
-        if row.lcp_rank <= 5:
-            results["lcp"].append((row.lcp_rank, entry))
-        if row.inp_rank <= 5:
-            results["inp"].append((row.inp_rank, entry))
-        if row.cls_rank <= 5:
-            results["cls"].append((row.cls_rank, entry))
-    # Sort by rank
-    for metric in results:
-        results[metric] = [e for _, e in sorted(results[metric])]
+    for row in rows:
+        results[row["metric"]].append(Offender(
+            row["origin"], row["device"], row["dealer_name"],
+            row["p75_lcp"], row["p75_inp"], row["p75_cls"],
+        ))
     return results
 
 
-def fetch_improvements(client, config, target_yyyymm, prev_yyyymm):
-    """Run improvements SQL, return dict grouped by category."""
-    sql = read_sql("slack_improvements.sql")
-    query = format_sql(sql, config,
-                       target_yyyymm=target_yyyymm,
-                       prev_yyyymm=prev_yyyymm)
-    results = {}
-    for row in client.query(query).result():
-        cat = row.category
-        results.setdefault(cat, []).append({
-            "origin": row.origin,
-            "device": row.device,
-            "dealer_name": row.dealer_name,
-            "current_value": row.current_value,
-            "prev_value": row.prev_value,
-            "delta": row.delta,
-        })
-    return results
+def fetch_notification_data(client, config, target_yyyymm, prev_yyyymm, use_cache=True):
+    """Run the combined Slack query as one job.
+
+    Returns (has_prev, summary, regressions, worst, improvements). Regressions
+    and improvements are empty dicts if the previous month has no data. With
+    use_cache, results are reused from the local query cache until cwv_monthly
+    or origins is modified.
+    """
+    query = build_notification_query(config)
+    params = {"target_yyyymm": target_yyyymm, "prev_yyyymm": prev_yyyymm}
+
+    def run():
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter(name, "INT64", value)
+                for name, value in params.items()
+            ],
+            use_legacy_sql=False,
+        )
+        for row in client.query_and_wait(query, job_config=job_config):
+            # Column order matches slack_combined.sql; STRUCT columns already arrive as dicts
+            return list(row.values())
+        return [False, None, [], [], []]
+
+    if use_cache:
+        # Raw rows are cached (plain JSON); they're grouped into namedtuples below
+        table_mtime = max(
+            client.get_table(get_table_id(config, key)).modified.timestamp()
+            for key in ("cwv_monthly_table", "origins_table")
+        )
+        # result_format keys out entries cached before rows were stored ungrouped
+        raw = query_cache.get_or_compute(query, table_mtime, run, {**params, "result_format": "rows"})
+    else:
+        raw = run()
+
+    has_prev, summary, regression_rows, improvement_rows, worst_rows = raw
+    has_prev = bool(has_prev)
+    regressions = _group_by_category(regression_rows) if has_prev else {}
+    improvements = _group_by_category(improvement_rows) if has_prev else {}
+    worst = _group_worst_offenders(worst_rows)
+    return has_prev, summary or None, regressions, worst, improvements
 
 
 # ---------------------------------------------------------------------------
 # Slack message building (Block Kit)
 # ---------------------------------------------------------------------------
 
-def _delta_str(value, suffix="pp", decimals=1, invert=False):
-    """Format a delta value with arrow. invert=True means lower is better."""
+# Per-metric display formats. Deltas: kind -> (format spec, suffix, invert), where
+# invert=True means lower is better; "pp" is a percentage-point pass-rate delta.
+_DELTA_FORMATS = {
+    "pp": (".1f", "pp", False),
+    "lcp": (".0f", "ms", True),
+    "inp": (".0f", "ms", True),
+    "fcp": (".0f", "ms", True),
+    "ttfb": (".0f", "ms", True),
+    "cls": (".3f", "", True),
+}
+# Values: metric -> (format spec, suffix); anything not listed is a millisecond timing
+_VALUE_FORMATS = {"cls": (".3f", "")}
+_DEFAULT_VALUE_FORMAT = (",.0f", "ms")
+
+
+def _delta_str(value, kind="pp"):
+    """Format a delta value with arrow, using the _DELTA_FORMATS entry for kind."""
     if value is None:
         return "N/A"
-    sign = -1 if invert else 1
-    arrow = "\u25b2" if (value * sign) > 0 else "\u25bc" if (value * sign) < 0 else "\u25c6"
+    spec, suffix, invert = _DELTA_FORMATS[kind]
+    signed = -value if invert else value
+    arrow = "\u25b2" if signed > 0 else "\u25bc" if signed < 0 else "\u25c6"
     prefix = "+" if value > 0 else ""
-    return f"{arrow} {prefix}{value:.{decimals}f}{suffix}"
+    return f"{arrow} {prefix}{format(value, spec)}{suffix}"
 
 
 def _format_value(value, metric):
     """Format a metric value for display."""
     if value is None:
         return "N/A"
-    if metric == "cls":
-        return f"{value:.3f}"
-    return f"{value:,.0f}ms"
+    spec, suffix = _VALUE_FORMATS.get(metric, _DEFAULT_VALUE_FORMAT)
+    return f"{format(value, spec)}{suffix}"
 
 
 def _strip_origin(origin):
     """Remove protocol prefix from origin for display."""
-    if origin and origin.startswith("https://"):
-        return origin[8:]
-    if origin and origin.startswith("http://"):
-        return origin[7:]
-    return origin or "unknown"
+    if not origin:
+        return "unknown"
+    return origin.removeprefix("https://").removeprefix("http://")
 
 
 def _site_examples(items, metric, max_examples=5):
@@ -165,10 +182,10 @@ def _site_examples(items, metric, max_examples=5):
         return ""
     examples = []
     for item in items[:max_examples]:
-        site = _strip_origin(item["origin"])
-        prev_val = _format_value(item["prev_value"], metric)
-        cur_val = _format_value(item["current_value"], metric)
-        examples.append(f"{site} ({item['device']}): {prev_val} \u2192 {cur_val}")
+        site = _strip_origin(item.origin)
+        prev_val = _format_value(item.prev_value, metric)
+        cur_val = _format_value(item.current_value, metric)
+        examples.append(f"{site} ({item.device}): {prev_val} \u2192 {cur_val}")
     text = ", ".join(examples)
     remaining = len(items) - max_examples
     if remaining > 0:
@@ -176,6 +193,35 @@ def _site_examples(items, metric, max_examples=5):
     return text
 
 
+def _metric_line(summary, metric, label):
+    """Build the fleet snapshot line for one metric, or "" if it has no pass rate."""
+    rate = summary.get(f"{metric}_pass_rate")
+    if rate is None:
+        return ""
+    rate_delta = _delta_str(summary.get(f"{metric}_pass_rate_delta"))
+    p75 = _format_value(summary.get(f"avg_p75_{metric}"), metric)
+    p75_delta = _delta_str(summary.get(f"avg_p75_{metric}_delta"), metric)
+    return f"*{label}*  {rate}% {rate_delta}  |  p75: {p75} ({p75_delta})"
+
+
+def _mrkdwn_section(text):
+    """Build a Block Kit section block with mrkdwn text."""
+    return {"type": "section", "text": {"type": "mrkdwn", "text": text}}
+
+
+def _category_lines(groups, categories):
+    """One '*LCP:* N sites (e.g., ...)' line per (category, label) in categories."""
+    lines = []
+    for category, label in categories:
+        items = groups.get(category, [])
+        if items:
+            examples = _site_examples(items, category.split("_")[0], max_examples=3)
+            lines.append(f"*{label}:* {len(items)} sites (e.g., {examples})")
+        else:
+            lines.append(f"*{label}:* 0 sites")
+    return lines
+
+
 def build_slack_message(summary, regressions, worst, improvements, config, target_yyyymm, has_prev):
     """Build Block Kit JSON payload for Slack."""
     month_label = format_month_label(target_yyyymm)
@@ -195,32 +241,17 @@ def build_slack_message(summary, regressions, worst, improvements, config, targe
             f"({summary['coverage_pct']}%)"
         )
 
-        lcp_rate_delta = _delta_str(summary.get("lcp_pass_rate_delta"))
-        inp_rate_delta = _delta_str(summary.get("inp_pass_rate_delta"))
-        cls_rate_delta = _delta_str(summary.get("cls_pass_rate_delta"))
-        fcp_rate_delta = _delta_str(summary.get("fcp_pass_rate_delta"))
-        ttfb_rate_delta = _delta_str(summary.get("ttfb_pass_rate_delta"))
-
-        lcp_p75 = _format_value(summary.get("avg_p75_lcp"), "lcp")
-        inp_p75 = _format_value(summary.get("avg_p75_inp"), "inp")
-        cls_p75 = _format_value(summary.get("avg_p75_cls"), "cls")
-        fcp_p75 = _format_value(summary.get("avg_p75_fcp"), "fcp")
-        ttfb_p75 = _format_value(summary.get("avg_p75_ttfb"), "ttfb")
-
-        lcp_p75_delta = _delta_str(summary.get("avg_p75_lcp_delta"), suffix="ms", decimals=0, invert=True)
-        inp_p75_delta = _delta_str(summary.get("avg_p75_inp_delta"), suffix="ms", decimals=0, invert=True)
-        cls_p75_delta = _delta_str(summary.get("avg_p75_cls_delta"), suffix="", decimals=3, invert=True)
-        fcp_p75_delta = _delta_str(summary.get("avg_p75_fcp_delta"), suffix="ms", decimals=0, invert=True)
-        ttfb_p75_delta = _delta_str(summary.get("avg_p75_ttfb_delta"), suffix="ms", decimals=0, invert=True)
-
+        metric_lines = filter(None, [
+            _metric_line(summary, "lcp", "LCP"),
+            _metric_line(summary, "inp", "INP"),
+            _metric_line(summary, "cls", "CLS"),
+            _metric_line(summary, "fcp", "FCP"),
+            _metric_line(summary, "ttfb", "TTFB"),
+        ])
         fleet_text = (
             f"*Overall CWV Pass Rate:* {summary['cwv_pass_rate']}%  {cwv_delta}\n"
             f"*Coverage:* {coverage_text}\n\n"
-            f"*LCP*  {summary['lcp_pass_rate']}% {lcp_rate_delta}  |  p75: {lcp_p75} ({lcp_p75_delta})\n"
-            f"*INP*  {summary['inp_pass_rate']}% {inp_rate_delta}  |  p75: {inp_p75} ({inp_p75_delta})\n"
-            f"*CLS*  {summary['cls_pass_rate']}% {cls_rate_delta}  |  p75: {cls_p75} ({cls_p75_delta})\n"
-            f"*FCP*  {summary.get('fcp_pass_rate', 'N/A')}% {fcp_rate_delta}  |  p75: {fcp_p75} ({fcp_p75_delta})\n"
-            f"*TTFB*  {summary.get('ttfb_pass_rate', 'N/A')}% {ttfb_rate_delta}  |  p75: {ttfb_p75} ({ttfb_p75_delta})"
+            + "\n".join(metric_lines)
         )
 
         # DealerOn Target pass rates
@@ -246,43 +277,27 @@ def build_slack_message(summary, regressions, worst, improvements, config, targe
 
     # --- Regressions ---
     blocks.append({"type": "divider"})
-    if has_prev and regressions:
-        reg_lines = ["*Regressions (Good \u2192 Poor)*\n"]
-
-        for metric_key, label in [("lcp_regression", "LCP"), ("inp_regression", "INP"), ("cls_regression", "CLS")]:
-            items = regressions.get(metric_key, [])
-            metric = metric_key.split("_")[0]
-            if items:
-                examples = _site_examples(items[:3], metric, max_examples=3)
-                reg_lines.append(f"*{label}:* {len(items)} sites (e.g., {examples})")
-            else:
-                reg_lines.append(f"*{label}:* 0 sites")
+    title = "*Regressions (Good \u2192 Poor)*"
+    if not has_prev:
+        text = f"{title}\n\nNo previous month data for comparison."
+    elif not regressions:
+        text = f"{title}\n\nNo regressions detected."
+    else:
+        reg_lines = [f"{title}\n"]
+        reg_lines += _category_lines(regressions, [("lcp_regression", "LCP"), ("inp_regression", "INP"), ("cls_regression", "CLS")])
 
         # Largest LCP increases
         lcp_increases = regressions.get("lcp_increase", [])
         if lcp_increases:
             reg_lines.append("\n*Largest LCP increases:*")
             for i, item in enumerate(lcp_increases[:5], 1):
-                site = _strip_origin(item["origin"])
-                prev_v = _format_value(item["prev_value"], "lcp")
-                cur_v = _format_value(item["current_value"], "lcp")
-                delta_v = _format_value(abs(item["delta"]), "lcp")
-                reg_lines.append(f"  {i}. {site} ({item['device']}): {prev_v} \u2192 {cur_v} (+{delta_v})")
-
-        blocks.append({
-            "type": "section",
-            "text": {"type": "mrkdwn", "text": "\n".join(reg_lines)}
-        })
-    elif not has_prev:
-        blocks.append({
-            "type": "section",
-            "text": {"type": "mrkdwn", "text": "*Regressions (Good \u2192 Poor)*\n\nNo previous month data for comparison."}
-        })
-    else:
-        blocks.append({
-            "type": "section",
-            "text": {"type": "mrkdwn", "text": "*Regressions (Good \u2192 Poor)*\n\nNo regressions detected."}
-        })
+                site = _strip_origin(item.origin)
+                prev_v = _format_value(item.prev_value, "lcp")
+                cur_v = _format_value(item.current_value, "lcp")
+                delta_v = _format_value(abs(item.delta), "lcp")
+                reg_lines.append(f"  {i}. {site} ({item.device}): {prev_v} \u2192 {cur_v} (+{delta_v})")
+        text = "\n".join(reg_lines)
+    blocks.append(_mrkdwn_section(text))
 
     # --- Worst Offenders ---
     if worst:
@@ -294,43 +309,24 @@ def build_slack_message(summary, regressions, worst, improvements, config, targe
             if items:
                 worst_lines.append(f"*{label}:*")
                 for i, item in enumerate(items[:5], 1):
-                    site = _strip_origin(item["origin"])
-                    val = _format_value(item[value_key], metric)
-                    worst_lines.append(f"  {i}. {site} ({item['device']}) \u2014 {val}")
+                    site = _strip_origin(item.origin)
+                    val = _format_value(getattr(item, value_key), metric)
+                    worst_lines.append(f"  {i}. {site} ({item.device}) \u2014 {val}")
 
-        blocks.append({
-            "type": "section",
-            "text": {"type": "mrkdwn", "text": "\n".join(worst_lines)}
-        })
+        blocks.append(_mrkdwn_section("\n".join(worst_lines)))
 
     # --- Improvements ---
     blocks.append({"type": "divider"})
-    if has_prev and improvements:
-        imp_lines = ["*Improvements (Poor \u2192 Good)*\n"]
-
-        for metric_key, label in [("lcp_improvement", "LCP"), ("inp_improvement", "INP"), ("cls_improvement", "CLS")]:
-            items = improvements.get(metric_key, [])
-            metric = metric_key.split("_")[0]
-            if items:
-                examples = _site_examples(items[:3], metric, max_examples=3)
-                imp_lines.append(f"*{label}:* {len(items)} sites (e.g., {examples})")
-            else:
-                imp_lines.append(f"*{label}:* 0 sites")
-
-        blocks.append({
-            "type": "section",
-            "text": {"type": "mrkdwn", "text": "\n".join(imp_lines)}
-        })
-    elif not has_prev:
-        blocks.append({
-            "type": "section",
-            "text": {"type": "mrkdwn", "text": "*Improvements (Poor \u2192 Good)*\n\nNo previous month data for comparison."}
-        })
+    title = "*Improvements (Poor \u2192 Good)*"
+    if not has_prev:
+        text = f"{title}\n\nNo previous month data for comparison."
+    elif not improvements:
+        text = f"{title}\n\nNo improvements detected."
     else:
-        blocks.append({
-            "type": "section",
-            "text": {"type": "mrkdwn", "text": "*Improvements (Poor \u2192 Good)*\n\nNo improvements detected."}
-        })
+        imp_lines = [f"{title}\n"]
+        imp_lines += _category_lines(improvements, [("lcp_improvement", "LCP"), ("inp_improvement", "INP"), ("cls_improvement", "CLS")])
+        text = "\n".join(imp_lines)
+    blocks.append(_mrkdwn_section(text))
 
     # --- Dashboard buttons ---
     grafana = config.get("grafana", {})
@@ -370,39 +366,90 @@ def get_webhook_url(config):
     return config.get("slack", {}).get("webhook_url") or None
 
 
+# Compact, UTF-8 JSON for the webhook body: no whitespace and no \uXXXX escapes
+_PAYLOAD_ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+_slack_session = None
+
+
+def _get_slack_session():
+    """Return a keep-alive session for Slack, with retry/backoff on transient errors."""
+    global _slack_session
+    if _slack_session is None:
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset({"POST"}),
+            raise_on_status=False,  # Return the last response so its body can be reported
+        )
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retry)
+        _slack_session = requests.Session()
+        _slack_session.mount("https://", adapter)
+    return _slack_session
+
+
 def post_to_slack(webhook_url, payload):
     """POST JSON payload to Slack webhook. Returns True on success."""
-    data = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(
-        webhook_url,
-        data=data,
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
+    data = _PAYLOAD_ENCODER.encode(payload).encode("utf-8")
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            if resp.status == 200:
-                return True
-            body = resp.read().decode("utf-8", errors="replace")
-            print(f"  WARNING: Slack returned status {resp.status}: {body}")
-            return False
-    except urllib.error.HTTPError as e:
-        body = e.read().decode("utf-8", errors="replace")
-        print(f"  WARNING: Slack HTTP error {e.code}: {body}")
+        resp = _get_slack_session().post(
+            webhook_url,
+            data=data,
+            headers={"Content-Type": "application/json"},
+            timeout=30,
+        )
+    except requests.exceptions.RequestException as e:
+        print(f"  WARNING: Slack network error: {e}")
         return False
-    except urllib.error.URLError as e:
-        print(f"  WARNING: Slack network error: {e.reason}")
+
+    if resp.status_code == 200:
+        return True
+    print(f"  WARNING: Slack HTTP error {resp.status_code}: {resp.text}")
+    return False
+
+
+def _sent_hash_path(target_yyyymm):
+    """Where the hash of the last payload posted for target_yyyymm is kept."""
+    return query_cache.CACHE_DIR / f"last_sent_{target_yyyymm}.hash"
+
+
+def _payload_hash(payload):
+    """Stable SHA256 of a payload (key order doesn't matter)."""
+    data = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _already_sent(target_yyyymm, digest):
+    """True if the last payload posted for target_yyyymm had this hash."""
+    try:
+        return _sent_hash_path(target_yyyymm).read_text().strip() == digest
+    except OSError:
         return False
 
 
+def _record_sent(target_yyyymm, digest):
+    """Remember the hash of the payload just posted for target_yyyymm."""
+    path = _sent_hash_path(target_yyyymm)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(digest)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Worst case the same message is posted again next run.
+        pass
+
+
 # ---------------------------------------------------------------------------
 # Orchestrator
 # ---------------------------------------------------------------------------
 
-def post_notification(client, config, target_yyyymm, dry_run=False):
+def post_notification(client, config, target_yyyymm, dry_run=False, use_cache=True, resend=False):
     """Fetch all data, build Slack message, and post it.
 
-    Returns True on success, False on failure.
+    A payload identical to the last one posted for the same month is not
+    re-posted unless resend is set. Returns True on success, False on failure.
     """
     # Check if Slack is disabled
     slack_config = config.get("slack", {})
@@ -416,22 +463,13 @@ def post_notification(client, config, target_yyyymm, dry_run=False):
         return False
 
     prev_yyyymm = compute_prev_month(target_yyyymm)
-    has_prev = check_prev_month_exists(client, config, prev_yyyymm)
 
     print(f"  Fetching Slack notification data for {target_yyyymm}...")
 
-    # Fleet summary — always fetch (uses prev for deltas, NULLs if missing)
-    summary = fetch_fleet_summary(client, config, target_yyyymm, prev_yyyymm)
-
-    # Regressions & improvements — only if previous month exists
-    regressions = {}
-    improvements = {}
-    if has_prev:
-        regressions = fetch_regressions(client, config, target_yyyymm, prev_yyyymm)
-        improvements = fetch_improvements(client, config, target_yyyymm, prev_yyyymm)
-
-    # Worst offenders — always
-    worst = fetch_worst_offenders(client, config, target_yyyymm)
+    # One job for all sections: the previous-month check, fleet summary (uses
+    # prev for deltas, NULLs if missing), regressions, improvements and worst offenders
+    has_prev, summary, regressions, worst, improvements = fetch_notification_data(
+        client, config, target_yyyymm, prev_yyyymm, use_cache=use_cache)
 
     # Build message
     payload = build_slack_message(summary, regressions, worst, improvements,
@@ -445,9 +483,18 @@ def post_notification(client, config, target_yyyymm, dry_run=False):
             print(json.dumps(payload, indent=2, ensure_ascii=True))
         return True
 
+    # Skip re-runs (retries, manual triggers) that would post the same message again
+    digest = _payload_hash(payload)
+    if not resend and _already_sent(target_yyyymm, digest):
+        print(f"  Identical message for {target_yyyymm} was already posted; skipping (use --resend to post anyway).")
+        return True
+
     # Post
     print("  Posting to Slack...")
-    return post_to_slack(webhook_url, payload)
+    if not post_to_slack(webhook_url, payload):
+        return False
+    _record_sent(target_yyyymm, digest)
+    return True
 
 
 # ---------------------------------------------------------------------------
@@ -459,12 +506,15 @@ def main():
     parser.add_argument("--month", type=int, required=True, help="Target month as YYYYMM")
     parser.add_argument("--config", help="Path to settings.yaml")
     parser.add_argument("--dry-run", action="store_true", help="Print payload to stdout instead of posting")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the local query result cache")
+    parser.add_argument("--resend", action="store_true", help="Post even if an identical message was already sent for this month")
     args = parser.parse_args()
 
     config = load_config(args.config)
     client = get_client(config)
 
-    success = post_notification(client, config, args.month, dry_run=args.dry_run)
+    success = post_notification(client, config, args.month, dry_run=args.dry_run,
+                                use_cache=not args.no_cache, resend=args.resend)
     if not success:
         sys.exit(1)
 
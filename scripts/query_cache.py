@@ -0,0 +1,92 @@
+"""Local on-disk cache for dry-run estimates and small query results.
+
+Used by dry_run.py (bytes estimates), notify_slack.py and validate.py (result
+rows) so re-running them against unchanged tables doesn't re-issue the query.
+Entries are keyed by a SHA256 of the whitespace-normalized SQL and its params
+plus the last-modified time of the table(s) it reads, so a re-extraction
+invalidates them. Callers put anything that changes the result (query
+parameters, dry_run, result format) in params. Only JSON-serializable values
+are cached. Entries older than CACHE_TTL_SECONDS are ignored.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "cwv-fleet-monitor"
+CACHE_FILE = CACHE_DIR / "query_cache.json"
+CACHE_TTL_SECONDS = 24 * 60 * 60
+
+_lock = threading.Lock()
+_entries = None
+
+
+def _normalize(sql):
+    """Collapse whitespace so formatting-only changes don't miss the cache."""
+    return " ".join(sql.split())
+
+
+def cache_key(sql, table_mtime, params=None):
+    """Build the cache key: sha256(normalized sql + params):mtime_epoch."""
+    payload = _normalize(sql) + "\n" + json.dumps(params or {}, sort_keys=True)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"{digest}:{int(table_mtime)}"
+
+
+def _load():
+    global _entries
+    if _entries is None:
+        try:
+            with open(CACHE_FILE) as f:
+                _entries = json.load(f)
+        except (OSError, ValueError):
+            _entries = {}
+    return _entries
+
+
+def _save(entries):
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = CACHE_FILE.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, CACHE_FILE)
+    except OSError:
+        # A cache that can't be written is just a cache miss next time.
+        pass
+
+
+def _is_serializable(value):
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def get_or_compute(sql, table_mtime, fn, params=None):
+    """Return the cached value for sql (with params), or call fn() and cache it."""
+    key = cache_key(sql, table_mtime, params)
+    now = time.time()
+
+    with _lock:
+        entry = _load().get(key)
+        if entry and now - entry["cached_at"] < CACHE_TTL_SECONDS:
+            return entry["value"]
+
+    value = fn()
+    if not _is_serializable(value):
+        # Checked up front so a bad value never reaches the in-memory entries
+        return value
+
+    with _lock:
+        entries = _load()
+        # Drop expired entries while we're rewriting the file anyway
+        for k in [k for k, e in entries.items() if now - e["cached_at"] >= CACHE_TTL_SECONDS]:
+            del entries[k]
+        entries[key] = {"value": value, "cached_at": now}
+        _save(entries)
+    return value
@@ -0,0 +1,59 @@
+"""Run the monthly update (extract, then validate) in a single process.
+
+Equivalent to running extract_monthly.py followed by validate.py, but the
+config is parsed and the BigQuery client created only once.
+
+Usage:
+    python scripts/run_all.py [--month YYYYMM] [--force] [--notify] [--config path/to/settings.yaml]
+"""
+
+import argparse
+import sys
+
+import extract_monthly
+import validate
+
+
+def run_step(name, step_main, argv):
+    """Run a script's main() in-process with argv; return its exit code."""
+    print(f"\n{'=' * 40}\n{name}\n{'=' * 40}")
+    saved_argv = sys.argv
+    sys.argv = [f"{name}.py"] + argv
+    try:
+        step_main()
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        sys.argv = saved_argv
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the monthly CrUX update: extract, then validate")
+    parser.add_argument("--month", type=int, help="Target month as YYYYMM (auto-detects latest if omitted)")
+    parser.add_argument("--force", action="store_true", help="Re-extract even if data exists")
+    parser.add_argument("--notify", action="store_true", help="Post summary to Slack after extraction")
+    parser.add_argument("--config", help="Path to settings.yaml")
+    args = parser.parse_args()
+
+    common_args = ["--config", args.config] if args.config else []
+
+    extract_args = list(common_args)
+    if args.month:
+        extract_args += ["--month", str(args.month)]
+    if args.force:
+        extract_args.append("--force")
+    if args.notify:
+        extract_args.append("--notify")
+
+    code = run_step("extract_monthly", extract_monthly.main, extract_args)
+    if code:
+        print(f"ERROR: extract_monthly failed (exit {code}); skipping validation")
+        sys.exit(code)
+
+    code = run_step("validate", validate.main, common_args)
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
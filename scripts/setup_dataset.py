@@ -9,120 +9,146 @@ import sys
 
 from google.cloud import bigquery
 
-from common import load_config, get_client
-
-
-def create_dataset(client, config):
-    """Create the dataset if it doesn't exist."""
-    dataset_id = f"{config['gcp']['project_id']}.{config['bigquery']['dataset_name']}"
-    dataset = bigquery.Dataset(dataset_id)
-    dataset.location = config["gcp"].get("location", "US")
-
-    dataset = client.create_dataset(dataset, exists_ok=True)
-    print(f"Dataset ready: {dataset.full_dataset_id}")
-    return dataset
-
-
-def create_origins_table(client, config):
-    """Create the origins table (dealer site registry)."""
-    table_id = f"{config['gcp']['project_id']}.{config['bigquery']['dataset_name']}.{config['bigquery']['origins_table']}"
-
-    schema = [
-        bigquery.SchemaField("origin", "STRING", mode="REQUIRED"),
-        bigquery.SchemaField("dealer_name", "STRING"),
-        bigquery.SchemaField("dealer_group", "STRING"),
-        bigquery.SchemaField("oem_brand", "STRING"),
-        bigquery.SchemaField("region", "STRING"),
-        bigquery.SchemaField("state", "STRING"),
-        bigquery.SchemaField("platform_version", "STRING"),
-        bigquery.SchemaField("is_active", "BOOLEAN"),
-        bigquery.SchemaField("tags", "STRING"),
-        bigquery.SchemaField("added_at", "TIMESTAMP"),
-        bigquery.SchemaField("updated_at", "TIMESTAMP"),
-    ]
-
-    table = bigquery.Table(table_id, schema=schema)
-    table = client.create_table(table, exists_ok=True)
-    print(f"Table ready: {table.full_table_id}")
-
-
-def create_cwv_monthly_table(client, config):
-    """Create the cwv_monthly table with range partitioning and clustering."""
-    table_id = f"{config['gcp']['project_id']}.{config['bigquery']['dataset_name']}.{config['bigquery']['cwv_monthly_table']}"
-
-    schema = [
-        # Dimensions
-        bigquery.SchemaField("yyyymm", "INT64", mode="REQUIRED"),
-        bigquery.SchemaField("date", "DATE"),
-        bigquery.SchemaField("origin", "STRING", mode="REQUIRED"),
-        bigquery.SchemaField("device", "STRING"),
-        bigquery.SchemaField("rank", "INT64"),
-        # Dealer metadata (denormalized)
-        bigquery.SchemaField("dealer_name", "STRING"),
-        bigquery.SchemaField("dealer_group", "STRING"),
-        bigquery.SchemaField("oem_brand", "STRING"),
-        bigquery.SchemaField("region", "STRING"),
-        bigquery.SchemaField("state", "STRING"),
-        bigquery.SchemaField("platform_version", "STRING"),
-        # P75 values
-        bigquery.SchemaField("p75_lcp", "FLOAT64"),
-        bigquery.SchemaField("p75_fcp", "FLOAT64"),
-        bigquery.SchemaField("p75_inp", "FLOAT64"),
-        bigquery.SchemaField("p75_cls", "FLOAT64"),
-        bigquery.SchemaField("p75_ttfb", "FLOAT64"),
-        # LCP distribution
-        bigquery.SchemaField("fast_lcp", "FLOAT64"),
-        bigquery.SchemaField("avg_lcp", "FLOAT64"),
-        bigquery.SchemaField("slow_lcp", "FLOAT64"),
-        # FCP distribution
-        bigquery.SchemaField("fast_fcp", "FLOAT64"),
-        bigquery.SchemaField("avg_fcp", "FLOAT64"),
-        bigquery.SchemaField("slow_fcp", "FLOAT64"),
-        # INP distribution
-        bigquery.SchemaField("fast_inp", "FLOAT64"),
-        bigquery.SchemaField("avg_inp", "FLOAT64"),
-        bigquery.SchemaField("slow_inp", "FLOAT64"),
-        # CLS distribution
-        bigquery.SchemaField("small_cls", "FLOAT64"),
-        bigquery.SchemaField("medium_cls", "FLOAT64"),
-        bigquery.SchemaField("large_cls", "FLOAT64"),
-        # TTFB distribution
-        bigquery.SchemaField("fast_ttfb", "FLOAT64"),
-        bigquery.SchemaField("avg_ttfb", "FLOAT64"),
-        bigquery.SchemaField("slow_ttfb", "FLOAT64"),
-        # Device density
-        bigquery.SchemaField("desktopDensity", "FLOAT64"),
-        bigquery.SchemaField("phoneDensity", "FLOAT64"),
-        bigquery.SchemaField("tabletDensity", "FLOAT64"),
-        # Navigation types
-        bigquery.SchemaField("nav_navigate", "FLOAT64"),
-        bigquery.SchemaField("nav_navigate_cache", "FLOAT64"),
-        bigquery.SchemaField("nav_reload", "FLOAT64"),
-        bigquery.SchemaField("nav_restore", "FLOAT64"),
-        bigquery.SchemaField("nav_back_forward", "FLOAT64"),
-        bigquery.SchemaField("nav_back_forward_cache", "FLOAT64"),
-        bigquery.SchemaField("nav_prerender", "FLOAT64"),
-        # RTT
-        bigquery.SchemaField("low_rtt", "FLOAT64"),
-        bigquery.SchemaField("medium_rtt", "FLOAT64"),
-        bigquery.SchemaField("high_rtt", "FLOAT64"),
-        # Meta
-        bigquery.SchemaField("extracted_at", "TIMESTAMP"),
-    ]
-
-    table = bigquery.Table(table_id, schema=schema)
-
-    # Range partitioning on yyyymm
-    table.range_partitioning = bigquery.RangePartitioning(
-        field="yyyymm",
-        range_=bigquery.PartitionRange(start=202001, end=203001, interval=1),
-    )
-
-    # Clustering
-    table.clustering_fields = ["origin", "oem_brand", "region"]
-
-    table = client.create_table(table, exists_ok=True)
-    print(f"Table ready: {table.full_table_id}")
+from common import load_config, get_client, get_table_id, read_sql, format_sql
+
+
+# Table schemas (source of truth; the CREATE TABLE DDL is rendered from these)
+ORIGINS_SCHEMA = [
+    bigquery.SchemaField("origin", "STRING", mode="REQUIRED"),
+    bigquery.SchemaField("dealer_name", "STRING"),
+    bigquery.SchemaField("dealer_group", "STRING"),
+    bigquery.SchemaField("oem_brand", "STRING"),
+    bigquery.SchemaField("region", "STRING"),
+    bigquery.SchemaField("state", "STRING"),
+    bigquery.SchemaField("platform_version", "STRING"),
+    bigquery.SchemaField("is_active", "BOOLEAN"),
+    bigquery.SchemaField("tags", "STRING"),
+    bigquery.SchemaField("added_at", "TIMESTAMP"),
+    bigquery.SchemaField("updated_at", "TIMESTAMP"),
+]
+
+CWV_MONTHLY_SCHEMA = [
+    # Dimensions
+    bigquery.SchemaField("yyyymm", "INT64", mode="REQUIRED"),
+    bigquery.SchemaField("date", "DATE"),
+    bigquery.SchemaField("origin", "STRING", mode="REQUIRED"),
+    bigquery.SchemaField("device", "STRING"),
+    bigquery.SchemaField("rank", "INT64"),
+    # Dealer metadata (denormalized)
+    bigquery.SchemaField("dealer_name", "STRING"),
+    bigquery.SchemaField("dealer_group", "STRING"),
+    bigquery.SchemaField("oem_brand", "STRING"),
+    bigquery.SchemaField("region", "STRING"),
+    bigquery.SchemaField("state", "STRING"),
+    bigquery.SchemaField("platform_version", "STRING"),
+    # P75 values
+    bigquery.SchemaField("p75_lcp", "FLOAT64"),
+    bigquery.SchemaField("p75_fcp", "FLOAT64"),
+    bigquery.SchemaField("p75_inp", "FLOAT64"),
+    bigquery.SchemaField("p75_cls", "FLOAT64"),
+    bigquery.SchemaField("p75_ttfb", "FLOAT64"),
+    # LCP distribution
+    bigquery.SchemaField("fast_lcp", "FLOAT64"),
+    bigquery.SchemaField("avg_lcp", "FLOAT64"),
+    bigquery.SchemaField("slow_lcp", "FLOAT64"),
+    # FCP distribution
+    bigquery.SchemaField("fast_fcp", "FLOAT64"),
+    bigquery.SchemaField("avg_fcp", "FLOAT64"),
+    bigquery.SchemaField("slow_fcp", "FLOAT64"),
+    # INP distribution
+    bigquery.SchemaField("fast_inp", "FLOAT64"),
+    bigquery.SchemaField("avg_inp", "FLOAT64"),
+    bigquery.SchemaField("slow_inp", "FLOAT64"),
+    # CLS distribution
+    bigquery.SchemaField("small_cls", "FLOAT64"),
+    bigquery.SchemaField("medium_cls", "FLOAT64"),
+    bigquery.SchemaField("large_cls", "FLOAT64"),
+    # TTFB distribution
+    bigquery.SchemaField("fast_ttfb", "FLOAT64"),
+    bigquery.SchemaField("avg_ttfb", "FLOAT64"),
+    bigquery.SchemaField("slow_ttfb", "FLOAT64"),
+    # Device density
+    bigquery.SchemaField("desktopDensity", "FLOAT64"),
+    bigquery.SchemaField("phoneDensity", "FLOAT64"),
+    bigquery.SchemaField("tabletDensity", "FLOAT64"),
+    # Navigation types
+    bigquery.SchemaField("nav_navigate", "FLOAT64"),
+    bigquery.SchemaField("nav_navigate_cache", "FLOAT64"),
+    bigquery.SchemaField("nav_reload", "FLOAT64"),
+    bigquery.SchemaField("nav_restore", "FLOAT64"),
+    bigquery.SchemaField("nav_back_forward", "FLOAT64"),
+    bigquery.SchemaField("nav_back_forward_cache", "FLOAT64"),
+    bigquery.SchemaField("nav_prerender", "FLOAT64"),
+    # RTT
+    bigquery.SchemaField("low_rtt", "FLOAT64"),
+    bigquery.SchemaField("medium_rtt", "FLOAT64"),
+    bigquery.SchemaField("high_rtt", "FLOAT64"),
+    # Meta
+    bigquery.SchemaField("extracted_at", "TIMESTAMP"),
+]
+
+# cwv_monthly layout: one range partition per yyyymm, clustered for per-origin lookups
+CWV_MONTHLY_PARTITION_RANGE = (202001, 203001, 1)
+CWV_MONTHLY_CLUSTERING = ["origin", "oem_brand", "region"]
+
+AGG_VIEW_REFRESH_MINUTES = 60
+
+# SchemaField types whose GoogleSQL DDL spelling differs
+_DDL_TYPES = {"BOOLEAN": "BOOL", "INTEGER": "INT64", "FLOAT": "FLOAT64"}
+
+
+def _columns_ddl(schema):
+    """Render SchemaFields as a CREATE TABLE column list."""
+    columns = []
+    for field in schema:
+        column = f"    {field.name} {_DDL_TYPES.get(field.field_type, field.field_type)}"
+        if field.mode == "REQUIRED":
+            column += " NOT NULL"
+        columns.append(column)
+    return ",\n".join(columns)
+
+
+def build_setup_script(config):
+    """Render the dataset, tables and materialized view DDL as one multi-statement script."""
+    project = config["gcp"]["project_id"]
+    dataset = config["bigquery"]["dataset_name"]
+    location = config["gcp"].get("location", "US")
+    origins_id = get_table_id(config, "origins_table")
+    cwv_id = get_table_id(config, "cwv_monthly_table")
+    view_id = get_table_id(config, "cwv_monthly_agg_view")
+    start, end, interval = CWV_MONTHLY_PARTITION_RANGE
+
+    return f"""
+CREATE SCHEMA IF NOT EXISTS `{project}.{dataset}`
+OPTIONS (location = '{location}');
+
+CREATE TABLE IF NOT EXISTS `{origins_id}` (
+{_columns_ddl(ORIGINS_SCHEMA)}
+);
+
+CREATE TABLE IF NOT EXISTS `{cwv_id}` (
+{_columns_ddl(CWV_MONTHLY_SCHEMA)}
+)
+PARTITION BY RANGE_BUCKET(yyyymm, GENERATE_ARRAY({start}, {end}, {interval}))
+CLUSTER BY {", ".join(CWV_MONTHLY_CLUSTERING)};
+
+{format_sql(read_sql("cwv_monthly_agg.sql"), config, view_table=view_id, cwv_table=cwv_id,
+             partition_start=start, partition_end=end, partition_interval=interval,
+             refresh_minutes=AGG_VIEW_REFRESH_MINUTES).strip()};
+"""
+
+
+def setup_resources(client, config):
+    """Create the dataset, tables and materialized view in a single script job."""
+    client.query(build_setup_script(config)).result()
+
+    project = config["gcp"]["project_id"]
+    dataset = config["bigquery"]["dataset_name"]
+    print(f"Dataset ready: {project}:{dataset}")
+    for key in ("origins_table", "cwv_monthly_table"):
+        print(f"Table ready: {project}:{dataset}.{config['bigquery'][key]}")
+    view = get_table_id(config, "cwv_monthly_agg_view").rsplit(".", 1)[-1]
+    print(f"Materialized view ready: {project}:{dataset}.{view}")
 
 
 def main():
@@ -134,9 +160,7 @@ def main():
     client = get_client(config)
 
     print("Setting up BigQuery resources...")
-    create_dataset(client, config)
-    create_origins_table(client, config)
-    create_cwv_monthly_table(client, config)
+    setup_resources(client, config)
     print("\nSetup complete.")
 
 
@@ -1,167 +1,257 @@
 """Data validation and sanity checks.
 
 Usage:
-    python scripts/validate.py [--config path/to/settings.yaml]
+    python scripts/validate.py [--config path/to/settings.yaml] [--no-cache] [--fail-fast] [--full]
 """
 
 import argparse
 import sys
 
+from google.cloud import bigquery
+
+import query_cache
 from common import load_config, get_client, get_table_id
 
 
-def check_origins(client, config):
+# Metrics whose dist/density ratio is checked, and the accepted ratio range
+# (rendered into the validation SQL)
+DISTRIBUTION_METRICS = ["LCP", "FCP", "INP", "CLS", "TTFB"]
+RATIO_MIN, RATIO_MAX = 0.90, 1.10
+
+# Byte ceiling for the validation job (dry-run preflight and maximum_bytes_billed);
+# override with validate.max_bytes_billed
+DEFAULT_MAX_BYTES_BILLED = 10 * 1024**3
+
+
+def _distribution_select(cwv_table, month=None):
+    """SELECT projecting each row's device density and per-metric distribution sums.
+
+    month is a SQL expression; when given, only that month's partition is read.
+    """
+    month_filter = f"\n      AND yyyymm = {month}" if month else ""
+    return f"""
+    SELECT
+        CASE device WHEN 'desktop' THEN desktopDensity
+                    WHEN 'phone' THEN phoneDensity
+                    WHEN 'tablet' THEN tabletDensity END AS density,
+        fast_lcp + avg_lcp + slow_lcp AS lcp_sum,
+        fast_fcp + avg_fcp + slow_fcp AS fcp_sum,
+        fast_inp + avg_inp + slow_inp AS inp_sum,
+        small_cls + medium_cls + large_cls AS cls_sum,
+        fast_ttfb + avg_ttfb + slow_ttfb AS ttfb_sum
+    FROM `{cwv_table}`
+    WHERE fast_lcp IS NOT NULL AND device IS NOT NULL{month_filter}"""
+
+
+def build_validation_query(config, full=False):
+    """Render all checks as one script.
+
+    The month and NULL checks need every row, so both come from one GROUP BY
+    yyyymm pass over cwv_monthly's yyyymm/origin/device columns: each month's
+    row count, approximate origins and NULL counts (summed in check_nulls).
+    The latest month is resolved once into a script variable, and the coverage
+    check (and, unless full, the distribution check) read only that month's
+    partition. The final statement returns a single row with one column per
+    check.
+    """
+    origins_table = get_table_id(config, "origins_table")
+    cwv_table = get_table_id(config, "cwv_monthly_table")
+    ratio_ok_columns = ",\n".join(
+        f"                {m.lower()}_ratio BETWEEN {RATIO_MIN} AND {RATIO_MAX} AS {m.lower()}_ok"
+        for m in DISTRIBUTION_METRICS
+    )
+    return f"""
+    DECLARE latest_month INT64;
+
+    SET latest_month = (SELECT MAX(yyyymm) FROM `{cwv_table}`);
+
+    SELECT
+        (
+            SELECT AS STRUCT COUNT(*) as cnt, COUNTIF(is_active) as active
+            FROM `{origins_table}`
+        ) AS origins,
+
+        -- NULL-yyyymm rows form their own group (yyyymm IS NULL)
+        ARRAY(
+            SELECT AS STRUCT
+                yyyymm,
+                COUNT(*) as row_count,
+                APPROX_COUNT_DISTINCT(origin) as origins,
+                COUNTIF(origin IS NULL) as null_origins,
+                COUNTIF(device IS NULL) as null_devices
+            FROM `{cwv_table}`
+            GROUP BY yyyymm
+            ORDER BY yyyymm
+        ) AS months,
+
+        -- Each <metric>_ok is NULL when its ratio is (no data)
+        (
+            SELECT AS STRUCT
+                *,
+{ratio_ok_columns}
+            FROM (
+                SELECT
+                    AVG(SAFE_DIVIDE(lcp_sum, density)) as lcp_ratio,
+                    AVG(SAFE_DIVIDE(fcp_sum, density)) as fcp_ratio,
+                    AVG(SAFE_DIVIDE(inp_sum, density)) as inp_ratio,
+                    AVG(SAFE_DIVIDE(cls_sum, density)) as cls_ratio,
+                    AVG(SAFE_DIVIDE(ttfb_sum, density)) as ttfb_ratio
+                FROM ({_distribution_select(cwv_table, None if full else "latest_month")}
+                )
+            )
+        ) AS distributions,
+        {"CAST(NULL AS INT64)" if full else "latest_month"} AS distribution_month,
+
+        (
+            WITH active_origins AS (
+                SELECT COUNT(*) as total FROM `{origins_table}` WHERE is_active = TRUE
+            ),
+            matched AS (
+                SELECT APPROX_COUNT_DISTINCT(origin) as matched
+                FROM `{cwv_table}`
+                WHERE yyyymm = latest_month
+            )
+            SELECT AS STRUCT
+                ao.total as total_origins,
+                m.matched as origins_with_data,
+                ROUND(SAFE_DIVIDE(m.matched, ao.total) * 100, 1) as coverage_pct
+            FROM active_origins ao, matched m
+        ) AS coverage
+    """
+
+
+def estimate_scan_bytes(client, config, full=False):
+    """Dry-run the validation script itself; return BigQuery's bytes estimate.
+
+    The same SQL that fetch_validation_data submits is checked, so a bad table
+    id, missing permission or SQL error fails here without scanning anything.
+    The estimate is BigQuery's, not a guaranteed ceiling; maximum_bytes_billed
+    on the real job is what enforces the limit.
+    """
+    job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+    query = build_validation_query(config, full)
+    return client.query(query, job_config=job_config).total_bytes_processed
+
+
+def fetch_validation_data(client, config, use_cache=True, full=False, max_bytes_billed=None):
+    """Run the validation script as a single job.
+
+    Returns a dict keyed by check column (origins, months, distributions,
+    distribution_month, coverage); STRUCT columns arrive as dicts and the months
+    ARRAY as a list of dicts. With use_cache, the result is reused from the
+    local query cache until cwv_monthly or origins is modified. If the job
+    would bill more than max_bytes_billed, BigQuery fails it without running.
+    """
+    query = build_validation_query(config, full)
+
+    def run():
+        job_config = bigquery.QueryJobConfig(maximum_bytes_billed=max_bytes_billed)
+        row = next(iter(client.query_and_wait(query, job_config=job_config)), None)
+        return dict(row.items()) if row is not None else {}
+
+    if not use_cache:
+        return run()
+
+    # BigQuery doesn't cache multi-statement results, so repeat runs against
+    # unchanged tables are served from the local cache instead
+    table_mtime = max(
+        client.get_table(get_table_id(config, key)).modified.timestamp()
+        for key in ("cwv_monthly_table", "origins_table")
+    )
+    return query_cache.get_or_compute(query, table_mtime, run)
+
+
+def check_origins(data, lines):
     """Check origins table has data."""
-    table_id = get_table_id(config, "origins_table")
-    query = f"SELECT COUNT(*) as cnt, COUNTIF(is_active) as active FROM `{table_id}`"
-    result = client.query(query).result()
-    for row in result:
-        total, active = row.cnt, row.active
-        status = "PASS" if total > 0 else "FAIL"
-        print(f"  [{status}] Origins: {total} total, {active} active")
-        return total > 0
-    return False
-
-
-def check_cwv_months(client, config):
+    row = data["origins"]
+    total, active = row["cnt"], row["active"]
+    status = "PASS" if total > 0 else "FAIL"
+    lines.append(f"  [{status}] Origins: {total} total, {active} active")
+    return total > 0
+
+
+def check_cwv_months(data, lines):
     """Check cwv_monthly has continuous month coverage."""
-    table_id = get_table_id(config, "cwv_monthly_table")
-    query = f"""
-    SELECT yyyymm, COUNT(*) as row_count, COUNT(DISTINCT origin) as origins
-    FROM `{table_id}`
-    GROUP BY yyyymm
-    ORDER BY yyyymm
-    """
-    result = client.query(query).result()
-    months = list(result)
+    months = [m for m in data["months"] if m["yyyymm"] is not None]
 
     if not months:
-        print("  [FAIL] cwv_monthly: No data")
+        lines.append("  [FAIL] cwv_monthly: No data")
         return False
 
-    print(f"  [PASS] cwv_monthly: {len(months)} months of data")
+    lines.append(f"  [PASS] cwv_monthly: {len(months)} months of data")
     for m in months:
-        print(f"         {m.yyyymm}: {m.row_count} rows, {m.origins} origins")
+        lines.append(f"         {m['yyyymm']}: {m['row_count']} rows, ~{m['origins']} origins")
     return True
 
 
-def check_nulls(client, config):
-    """Check for NULL values in critical columns."""
-    table_id = get_table_id(config, "cwv_monthly_table")
-    query = f"""
-    SELECT
-        COUNTIF(origin IS NULL) as null_origins,
-        COUNTIF(device IS NULL) as null_devices,
-        COUNTIF(yyyymm IS NULL) as null_months
-    FROM `{table_id}`
-    """
-    result = client.query(query).result()
-    for row in result:
-        issues = []
-        if row.null_origins > 0:
-            issues.append(f"{row.null_origins} NULL origins")
-        if row.null_months > 0:
-            issues.append(f"{row.null_months} NULL months")
-
-        if issues:
-            print(f"  [FAIL] NULL check: {', '.join(issues)}")
-            return False
-        else:
-            info = ""
-            if row.null_devices > 0:
-                info = f" ({row.null_devices} NULL-device rows are CrUX rank aggregates — expected)"
-            print(f"  [PASS] NULL check: No NULLs in origin/yyyymm{info}")
-            return True
-    return False
-
-
-def check_distributions(client, config):
+def check_nulls(data, lines):
+    """Check for NULL values in critical columns (summed from the per-month counts)."""
+    months = data["months"]
+    null_origins = sum(m["null_origins"] for m in months)
+    null_devices = sum(m["null_devices"] for m in months)
+    null_months = sum(m["row_count"] for m in months if m["yyyymm"] is None)
+    issues = []
+    if null_origins > 0:
+        issues.append(f"{null_origins} NULL origins")
+    if null_months > 0:
+        issues.append(f"{null_months} NULL months")
+
+    if issues:
+        lines.append(f"  [FAIL] NULL check: {', '.join(issues)}")
+        return False
+    else:
+        info = ""
+        if null_devices > 0:
+            info = f" ({null_devices} NULL-device rows are CrUX rank aggregates — expected)"
+        lines.append(f"  [PASS] NULL check: No NULLs in origin/yyyymm{info}")
+        return True
+
+
+def check_distributions(data, lines):
     """Check that distribution fractions are consistent.
 
     Note: In the CrUX materialized device_summary table, distributions are
     density-weighted (multiplied by device traffic share). So fast_lcp + avg_lcp
     + slow_lcp ≈ deviceDensity, NOT 1.0. We validate that the ratio of
-    distribution sum to device density is close to 1.0.
+    distribution sum to device density is close to 1.0; the range test itself
+    runs in SQL (<metric>_ok). Only the latest month is checked unless --full.
     """
-    table_id = get_table_id(config, "cwv_monthly_table")
-    query = f"""
-    SELECT
-        AVG(SAFE_DIVIDE(fast_lcp + avg_lcp + slow_lcp,
-            CASE device WHEN 'desktop' THEN desktopDensity
-                        WHEN 'phone' THEN phoneDensity
-                        WHEN 'tablet' THEN tabletDensity END)) as lcp_ratio,
-        AVG(SAFE_DIVIDE(fast_fcp + avg_fcp + slow_fcp,
-            CASE device WHEN 'desktop' THEN desktopDensity
-                        WHEN 'phone' THEN phoneDensity
-                        WHEN 'tablet' THEN tabletDensity END)) as fcp_ratio,
-        AVG(SAFE_DIVIDE(fast_inp + avg_inp + slow_inp,
-            CASE device WHEN 'desktop' THEN desktopDensity
-                        WHEN 'phone' THEN phoneDensity
-                        WHEN 'tablet' THEN tabletDensity END)) as inp_ratio,
-        AVG(SAFE_DIVIDE(small_cls + medium_cls + large_cls,
-            CASE device WHEN 'desktop' THEN desktopDensity
-                        WHEN 'phone' THEN phoneDensity
-                        WHEN 'tablet' THEN tabletDensity END)) as cls_ratio,
-        AVG(SAFE_DIVIDE(fast_ttfb + avg_ttfb + slow_ttfb,
-            CASE device WHEN 'desktop' THEN desktopDensity
-                        WHEN 'phone' THEN phoneDensity
-                        WHEN 'tablet' THEN tabletDensity END)) as ttfb_ratio
-    FROM `{table_id}`
-    WHERE fast_lcp IS NOT NULL AND device IS NOT NULL
-    """
-    result = client.query(query).result()
-    for row in result:
-        all_ok = True
-        for metric, val in [
-            ("LCP", row.lcp_ratio), ("FCP", row.fcp_ratio),
-            ("INP", row.inp_ratio), ("CLS", row.cls_ratio),
-            ("TTFB", row.ttfb_ratio),
-        ]:
-            if val is None:
-                print(f"  [WARN] {metric} distribution: No data")
-                continue
-            ok = 0.90 <= val <= 1.10
-            status = "PASS" if ok else "FAIL"
-            print(f"  [{status}] {metric} dist/density ratio: {val:.4f} (expect ~1.0)")
-            if not ok:
-                all_ok = False
-        return all_ok
-    return False
-
-
-def check_coverage(client, config):
-    """Report coverage: origins with CrUX data vs total origins."""
-    origins_table = get_table_id(config, "origins_table")
-    cwv_table = get_table_id(config, "cwv_monthly_table")
+    row = data["distributions"]
+    all_ok = True
+    if data["distribution_month"] is not None:
+        lines.append(f"  [INFO] Checking {data['distribution_month']} only (--full checks every month)")
+    for metric in DISTRIBUTION_METRICS:
+        val, ok = row[f"{metric.lower()}_ratio"], row[f"{metric.lower()}_ok"]
+        if val is None:
+            lines.append(f"  [WARN] {metric} distribution: No data")
+            continue
+        status = "PASS" if ok else "FAIL"
+        lines.append(f"  [{status}] {metric} dist/density ratio: {val:.4f} (expect ~1.0)")
+        if not ok:
+            all_ok = False
+    return all_ok
 
-    query = f"""
-    WITH latest AS (
-        SELECT MAX(yyyymm) as latest_month FROM `{cwv_table}`
-    ),
-    active_origins AS (
-        SELECT COUNT(*) as total FROM `{origins_table}` WHERE is_active = TRUE
-    ),
-    matched AS (
-        SELECT COUNT(DISTINCT origin) as matched
-        FROM `{cwv_table}`
-        WHERE yyyymm = (SELECT latest_month FROM latest)
-    )
-    SELECT
-        ao.total as total_origins,
-        m.matched as origins_with_data,
-        ROUND(SAFE_DIVIDE(m.matched, ao.total) * 100, 1) as coverage_pct
-    FROM active_origins ao, matched m
+
+def check_coverage(data, lines):
+    """Report coverage: origins with CrUX data vs total origins.
+
+    Distinct origin counts (here and in check_cwv_months) are HyperLogLog
+    estimates, hence the "~".
     """
-    result = client.query(query).result()
-    for row in result:
-        print(f"  [INFO] Coverage: {row.origins_with_data}/{row.total_origins} origins have CrUX data ({row.coverage_pct}%)")
-        return True
-    return False
+    row = data["coverage"]
+    lines.append(f"  [INFO] Coverage: ~{row['origins_with_data']}/{row['total_origins']} origins have CrUX data (~{row['coverage_pct']}%)")
+    return True
 
 
 def main():
     parser = argparse.ArgumentParser(description="Validate CrUX data in BigQuery")
     parser.add_argument("--config", help="Path to settings.yaml")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the local query result cache")
+    parser.add_argument("--fail-fast", action="store_true",
+                        help="Stop reporting at the first failing check; the remaining checks are "
+                             "skipped, not failed (all checks share one query, so this doesn't reduce cost)")
+    parser.add_argument("--full", action="store_true",
+                        help="Check distributions across every month, not just the latest")
     args = parser.parse_args()
 
     config = load_config(args.config)
@@ -169,6 +259,24 @@ def main():
 
     print("Running validation checks...\n")
 
+    max_bytes = config.get("validate", {}).get("max_bytes_billed", DEFAULT_MAX_BYTES_BILLED)
+    try:
+        scan_bytes = estimate_scan_bytes(client, config, full=args.full)
+    except Exception as e:
+        print(f"ERROR: Validation query failed dry run: {e}")
+        sys.exit(1)
+    if scan_bytes > max_bytes:
+        print(f"ERROR: Validation would scan {scan_bytes / 1024**3:.2f} GB, over the "
+              f"{max_bytes / 1024**3:.2f} GB limit (validate.max_bytes_billed)")
+        sys.exit(1)
+
+    try:
+        data = fetch_validation_data(client, config, use_cache=not args.no_cache, full=args.full,
+                                     max_bytes_billed=max_bytes)
+    except Exception as e:
+        print(f"ERROR: Validation query failed: {e}")
+        sys.exit(1)
+
     checks = [
         ("Origins table", check_origins),
         ("CWV monthly coverage", check_cwv_months),
@@ -177,22 +285,31 @@ def main():
         ("Origin coverage", check_coverage),
     ]
 
+    # Each check appends its status lines; the report is written in one go
+    lines = []
     results = []
     for name, check_fn in checks:
-        print(f"{name}:")
+        lines.append(f"{name}:")
+        if args.fail_fast and results and not results[-1][1]:
+            lines.append("  [SKIP] Skipped by --fail-fast")
+            lines.append("")
+            continue
         try:
-            passed = check_fn(client, config)
+            passed = check_fn(data, lines)
             results.append((name, passed))
         except Exception as e:
-            print(f"  [ERROR] {e}")
+            lines.append(f"  [ERROR] {e}")
             results.append((name, False))
-        print()
+        lines.append("")
 
-    # Summary
+    # Summary (checks skipped by --fail-fast are reported, not counted)
     passed = sum(1 for _, ok in results if ok)
     total = len(results)
-    print(f"{'='*40}")
-    print(f"Results: {passed}/{total} checks passed")
+    lines.append(f"{'='*40}")
+    skipped = len(checks) - total
+    lines.append(f"Results: {passed}/{total} checks passed"
+                 + (f" ({skipped} skipped by --fail-fast)" if skipped else ""))
+    sys.stdout.write("\n".join(lines) + "\n")
 
     if passed < total:
         sys.exit(1)
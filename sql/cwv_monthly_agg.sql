@@ -0,0 +1,41 @@
+-- Materialized view DDL: per-month, per-device rollups of cwv_monthly for dashboard stat/trend panels
+-- Parameters: {view_table}, {cwv_table} (configured table ids), {partition_start}, {partition_end},
+-- {partition_interval} (cwv_monthly's range partitioning) and {refresh_minutes}
+-- Run by scripts/setup_dataset.py. Partitioned like cwv_monthly, so a re-extracted month
+-- (MERGE deleting that month's rows) invalidates only that month's partition of the view.
+-- Pass rates are SUM(x_good) / SUM(n) and averages are SUM(x_sum) / SUM(x_n), so any set of
+-- devices/months can be re-aggregated exactly.
+-- Per-origin rollups (CWV pass/fail pie) and distribution ratios (AVG(SAFE_DIVIDE(...))) can't be
+-- expressed this way and stay on cwv_monthly.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS `{view_table}`
+PARTITION BY RANGE_BUCKET(yyyymm, GENERATE_ARRAY({partition_start}, {partition_end}, {partition_interval}))
+OPTIONS (enable_refresh = true, refresh_interval_minutes = {refresh_minutes})
+AS
+SELECT
+    yyyymm,
+    device,
+    COUNT(*) AS n,
+    HLL_COUNT.INIT(origin) AS origins_sketch,
+
+    -- Rows meeting Google's "good" thresholds
+    COUNTIF(p75_lcp <= 2500) AS lcp_good,
+    COUNTIF(p75_inp <= 200) AS inp_good,
+    COUNTIF(p75_cls <= 0.10) AS cls_good,
+    COUNTIF(p75_fcp <= 1800) AS fcp_good,
+    COUNTIF(p75_ttfb <= 800) AS ttfb_good,
+
+    -- Sums and non-NULL counts for re-aggregatable averages
+    SUM(p75_lcp) AS lcp_sum,
+    COUNT(p75_lcp) AS lcp_n,
+    SUM(p75_inp) AS inp_sum,
+    COUNT(p75_inp) AS inp_n,
+    SUM(p75_cls) AS cls_sum,
+    COUNT(p75_cls) AS cls_n,
+    SUM(p75_fcp) AS fcp_sum,
+    COUNT(p75_fcp) AS fcp_n,
+    SUM(p75_ttfb) AS ttfb_sum,
+    COUNT(p75_ttfb) AS ttfb_n
+
+FROM `{cwv_table}`
+GROUP BY yyyymm, device
@@ -1,7 +1,13 @@
 -- Extraction query: pulls CrUX data for a specific month, joined with origins metadata
 -- Parameters: {project}, {dataset}, {target_yyyymm}
+--
+-- A single MERGE replaces the month atomically: ON FALSE means every source row is
+-- inserted, and any existing target rows for {target_yyyymm} are deleted. Re-running
+-- it (e.g. --force) needs no separate DELETE job. Source columns are aliased to the
+-- target column names and listed in table order so INSERT ROW lines up.
 
-INSERT INTO `{project}.{dataset}.cwv_monthly`
+MERGE `{project}.{dataset}.cwv_monthly` T
+USING (
 SELECT
     crux.yyyymm,
     crux.date,
@@ -55,13 +61,13 @@ SELECT
     crux.tabletDensity,
 
     -- Navigation types
-    crux.navigation_types_navigate,
-    crux.navigation_types_navigate_cache,
-    crux.navigation_types_reload,
-    crux.navigation_types_restore,
-    crux.navigation_types_back_forward,
-    crux.navigation_types_back_forward_cache,
-    crux.navigation_types_prerender,
+    crux.navigation_types_navigate AS nav_navigate,
+    crux.navigation_types_navigate_cache AS nav_navigate_cache,
+    crux.navigation_types_reload AS nav_reload,
+    crux.navigation_types_restore AS nav_restore,
+    crux.navigation_types_back_forward AS nav_back_forward,
+    crux.navigation_types_back_forward_cache AS nav_back_forward_cache,
+    crux.navigation_types_prerender AS nav_prerender,
 
     -- RTT
     crux.low_rtt,
@@ -69,7 +75,7 @@ SELECT
     crux.high_rtt,
 
     -- Meta
-    CURRENT_TIMESTAMP()
+    CURRENT_TIMESTAMP() AS extracted_at
 
 FROM `chrome-ux-report.materialized.device_summary` crux
 INNER JOIN `{project}.{dataset}.origins` o
@@ -77,3 +83,9 @@ INNER JOIN `{project}.{dataset}.origins` o
 WHERE
     crux.yyyymm = {target_yyyymm}
     AND o.is_active = TRUE
+) S
+ON FALSE
+WHEN NOT MATCHED BY SOURCE AND T.yyyymm = {target_yyyymm} THEN
+    DELETE
+WHEN NOT MATCHED THEN
+    INSERT ROW
@@ -0,0 +1,38 @@
+-- All Slack notification data in a single job: one row, one column per section
+-- Parameters: {project}, {dataset}, plus the formatted slack_fleet_summary /
+-- regressions / improvements / worst_offenders queries; query parameters
+-- @target_yyyymm, @prev_yyyymm
+
+SELECT
+    (
+        SELECT COUNT(*) > 0
+        FROM `{project}.{dataset}.cwv_monthly`
+        WHERE yyyymm = @prev_yyyymm
+    ) AS has_prev,
+
+    (
+        SELECT AS STRUCT * FROM (
+{fleet_summary}
+        )
+    ) AS fleet_summary,
+
+    ARRAY(
+        SELECT AS STRUCT * FROM (
+{regressions}
+        )
+        ORDER BY category, delta DESC
+    ) AS regressions,
+
+    ARRAY(
+        SELECT AS STRUCT * FROM (
+{improvements}
+        )
+        ORDER BY category, delta ASC
+    ) AS improvements,
+
+    ARRAY(
+        SELECT AS STRUCT * FROM (
+{worst_offenders}
+        )
+        ORDER BY metric, metric_rank
+    ) AS worst_offenders
@@ -1,5 +1,5 @@
 -- Fleet health summary with month-over-month comparison
--- Parameters: {project}, {dataset}, {target_yyyymm}, {prev_yyyymm}
+-- Parameters: {project}, {dataset}; query parameters @target_yyyymm, @prev_yyyymm
 
 WITH current_month AS (
     SELECT
@@ -16,7 +16,7 @@ WITH current_month AS (
         CASE WHEN p75_inp <= 200 THEN 1 ELSE 0 END AS inp_pass,
         CASE WHEN p75_cls <= 0.1 THEN 1 ELSE 0 END AS cls_pass
     FROM `{project}.{dataset}.cwv_monthly`
-    WHERE yyyymm = {target_yyyymm}
+    WHERE yyyymm = @target_yyyymm
 ),
 
 prev_month AS (
@@ -33,7 +33,7 @@ prev_month AS (
         CASE WHEN p75_inp <= 200 THEN 1 ELSE 0 END AS inp_pass,
         CASE WHEN p75_cls <= 0.1 THEN 1 ELSE 0 END AS cls_pass
     FROM `{project}.{dataset}.cwv_monthly`
-    WHERE yyyymm = {prev_yyyymm}
+    WHERE yyyymm = @prev_yyyymm
 ),
 
 current_stats AS (
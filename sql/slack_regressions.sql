@@ -1,16 +1,16 @@
 -- Sites that regressed: good -> poor, plus largest LCP increases
--- Parameters: {project}, {dataset}, {target_yyyymm}, {prev_yyyymm}
+-- Parameters: {project}, {dataset}; query parameters @target_yyyymm, @prev_yyyymm
 
 WITH cur AS (
     SELECT origin, device, dealer_name, p75_lcp, p75_inp, p75_cls
     FROM `{project}.{dataset}.cwv_monthly`
-    WHERE yyyymm = {target_yyyymm}
+    WHERE yyyymm = @target_yyyymm
 ),
 
 prev AS (
     SELECT origin, device, p75_lcp, p75_inp, p75_cls
     FROM `{project}.{dataset}.cwv_monthly`
-    WHERE yyyymm = {prev_yyyymm}
+    WHERE yyyymm = @prev_yyyymm
 ),
 
 joined AS (
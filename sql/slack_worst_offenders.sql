@@ -1,31 +1,36 @@
--- Top 5 worst sites per core metric
--- Parameters: {project}, {dataset}, {target_yyyymm}
+-- Top 5 worst sites per core metric (at most 15 rows)
+-- Parameters: {project}, {dataset}; query parameter @target_yyyymm
 
-WITH ranked AS (
-    SELECT
-        origin,
-        device,
-        dealer_name,
-        p75_lcp,
-        p75_inp,
-        p75_cls,
-        ROW_NUMBER() OVER (ORDER BY p75_lcp DESC) AS lcp_rank,
-        ROW_NUMBER() OVER (ORDER BY p75_inp DESC) AS inp_rank,
-        ROW_NUMBER() OVER (ORDER BY p75_cls DESC) AS cls_rank
+WITH cur AS (
+    SELECT origin, device, dealer_name, p75_lcp, p75_inp, p75_cls
     FROM `{project}.{dataset}.cwv_monthly`
-    WHERE yyyymm = {target_yyyymm}
+    WHERE yyyymm = @target_yyyymm
+),
+
+worst_lcp AS (
+    SELECT 'lcp' AS metric, ROW_NUMBER() OVER (ORDER BY p75_lcp DESC) AS metric_rank, *
+    FROM cur
+    ORDER BY metric_rank
+    LIMIT 5
+),
+
+worst_inp AS (
+    SELECT 'inp' AS metric, ROW_NUMBER() OVER (ORDER BY p75_inp DESC) AS metric_rank, *
+    FROM cur
+    ORDER BY metric_rank
+    LIMIT 5
+),
+
+worst_cls AS (
+    SELECT 'cls' AS metric, ROW_NUMBER() OVER (ORDER BY p75_cls DESC) AS metric_rank, *
+    FROM cur
+    ORDER BY metric_rank
+    LIMIT 5
 )
 
-SELECT
-    origin,
-    device,
-    dealer_name,
-    p75_lcp,
-    p75_inp,
-    p75_cls,
-    lcp_rank,
-    inp_rank,
-    cls_rank
-FROM ranked
-WHERE lcp_rank <= 5 OR inp_rank <= 5 OR cls_rank <= 5
-ORDER BY lcp_rank
+SELECT * FROM worst_lcp
+UNION ALL
+SELECT * FROM worst_inp
+UNION ALL
+SELECT * FROM worst_cls
+ORDER BY metric, metric_rank